@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Applied to every new SQLite connection; override per key with the SQLITE_PRAGMAS setting.
+# WAL lets readers run alongside the single writer, and busy_timeout makes a writer wait for
+# the lock instead of failing at once with "database is locked".
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'foreign_keys': 'on',
+    'temp_store': 'memory',
+    'mmap_size': 128 * 1024 * 1024,
+    # Negative values are KiB rather than pages.
+    'cache_size': -32000,
+}
+# Models of these apps are read from the replica inside replica_reads(); sessions, auth and
+# contenttypes always use the primary so a fresh login is never read back stale.
+REPLICA_APPS = ('blogs', 'accounts')
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def sqlite_pragmas():
+    return {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            if value is not None:
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def use_replica():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view):
+    # For read-only views. Unsafe methods, and requests carrying flash messages (the redirect
+    # right after a write), stay on the primary so users see their own changes.
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or has_pending_messages(request):
+            return view(request, *args, **kwargs)
+        with use_replica():
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def has_pending_messages(request):
+    # Peeks without consuming, so the messages stay queued for the page that shows them.
+    storage = messages.get_messages(request)
+    pending = any(True for _ in storage)
+    storage.used = False
+    return pending
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.app_label in REPLICA_APPS:
+            # DATABASE_READ_REPLICA is a DATABASES alias, or None to read from the primary.
+            return getattr(settings, 'DATABASE_READ_REPLICA', None)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either may be related.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return None
@@ -1,5 +1,6 @@
 # settings.py
 
+import json
 from pathlib import Path
 from django.contrib import messages
 import os
@@ -35,9 +36,11 @@ INSTALLED_APPS = [
     'ckeditor_uploader',
     'blogs',
     'accounts',
+    'monitoring',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,6 +48,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so a profile covers the view and its exception handling but no other middleware.
+    'monitoring.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'BlogWebSiteWithDjango.urls'
@@ -60,6 +65,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blogs.context_processors.popular',
+                'accounts.context_processors.header',
             ],
         },
     },
@@ -70,13 +77,51 @@ WSGI_APPLICATION = 'BlogWebSiteWithDjango.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connections are kept open between requests (CONN_MAX_AGE seconds) and every SQLite
+# connection is tuned by BlogWebSiteWithDjango.database (WAL, busy_timeout, mmap, cache).
+CONN_MAX_AGE = int(os.getenv('CONN_MAX_AGE', '600'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Per-pragma overrides of DEFAULT_SQLITE_PRAGMAS, e.g. {'synchronous': 'full'}; None skips one.
+SQLITE_PRAGMAS = {}
+
+# Optional read replica: a copy of the primary (for example kept in sync with Litestream or
+# sqlite3_rsync) that views wrapped in replica_reads() read from. Writes always go to default.
+if os.getenv('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DATABASE_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_READ_REPLICA = 'replica' if 'replica' in DATABASES else None
+DATABASE_ROUTERS = ['BlogWebSiteWithDjango.database.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Every worker must see the same cache: the content generation (blogs.conditional) lives
+# there, and a per-process cache would leave other workers serving stale pages and 304s.
+# Files under BASE_DIR/cache by default, which one host's workers share; point CACHE_BACKEND
+# at Redis or memcached when running on more than one host.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+}
+
+# Seconds an anonymous page stays in the full-page cache (blogs.pagecache); content changes
+# invalidate it sooner. 0 turns the cache off.
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '300'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -115,6 +160,21 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# With STATIC_MANIFEST=True, collectstatic writes content-hashed files (plus .gz/.br
+# variants) that can be served with a far-future Cache-Control; requires running collectstatic.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'BlogWebSiteWithDjango.storage.CompressedManifestStaticFilesStorage'
+            if os.getenv('STATIC_MANIFEST', 'False') == 'True'
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -123,6 +183,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Generated sitemap shards (see blogs.sitemaps); must be writable by the app server.
+SITEMAP_ROOT = os.getenv('SITEMAP_ROOT', BASE_DIR / 'sitemaps')
+
 CKEDITOR_UPLOAD_PATH = 'uploads/'
 
 CKEDITOR_CONFIGS = {
@@ -148,3 +211,37 @@ EMAIL_BACKEND = 'django_mailjet.backends.MailjetBackend'
 MAILJET_API_KEY = os.getenv('MAILJET_API_KEY')
 MAILJET_API_SECRET = os.getenv('MAILJET_API_SECRET')
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_ADDRESS')
+
+# Request instrumentation (monitoring.middleware.RequestTimingMiddleware): a Server-Timing
+# header on every response and a JSON line per request slower than SLOW_REQUEST_MS. The header
+# shows SQL and view timings to anyone, so only enable it where that is acceptable.
+REQUEST_TIMING = os.getenv('REQUEST_TIMING', 'False') == 'True'
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '500'))
+# JSON lines go to this file, or to stderr when unset.
+SLOW_REQUEST_LOG = os.getenv('SLOW_REQUEST_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_requests': (
+            {'class': 'logging.FileHandler', 'filename': SLOW_REQUEST_LOG, 'formatter': 'message'}
+            if SLOW_REQUEST_LOG
+            else {'class': 'logging.StreamHandler', 'formatter': 'message'}
+        ),
+    },
+    'loggers': {
+        'monitoring.slow_requests': {'handlers': ['slow_requests'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# On-demand profiling (monitoring.middleware.ProfilingMiddleware). Staff trigger a profile with
+# a signed token from the Request profiles admin page, passed as ?_profile= or an
+# X-Profile-Token header; PROFILE_SAMPLE_RATES additionally profiles a share of the requests
+# to named URLs, e.g. {"blog_detail": 0.01}. Only the newest PROFILE_KEEP profiles are kept.
+PROFILE_SAMPLE_RATES = json.loads(os.getenv('PROFILE_SAMPLE_RATES', '{}'))
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '200'))
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from accounts.models import Profile
+from django.utils import timezone
+
+from accounts.models import OutgoingEmail, Profile
 
 
 @admin.register(Profile)
@@ -12,4 +14,20 @@ class ProfileAdmin(admin.ModelAdmin):
         (None, {'fields': ('user', 'job', 'birth_date', 'bio', 'profile_picture')}),
         ('Additional Info', {'fields': ('created_at',)}),
     )
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    ordering = ('-created_at',)
+    actions = ('requeue',)
+
+    @admin.action(description='Requeue selected emails')
+    def requeue(self, request, queryset):
+        queryset.exclude(status=OutgoingEmail.SENT).update(
+            status=OutgoingEmail.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
 # Register your models here.
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from accounts.header import header_snapshot
+
+
+def header(request):
+    # Lazy, so responses that never render the navbar skip the cache lookup.
+    return {'header': SimpleLazyObject(lambda: header_snapshot(request.user))}
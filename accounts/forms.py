@@ -3,6 +3,7 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm, Pass
 from django.contrib.auth.models import User
 
 from accounts.models import Profile
+from blogs.thumbnails import normalize_upload
 
 
 class RegistrationForm(UserCreationForm):
@@ -96,6 +97,9 @@ class ProfileForm(forms.ModelForm):
             'bio': forms.Textarea(attrs={'class': 'form-control', 'placeholder': 'Bio'}),
         }
 
+    def clean_profile_picture(self):
+        return normalize_upload(self.cleaned_data.get('profile_picture'))
+
 class CustomPasswordResetForm(PasswordResetForm):
     def clean_email(self):
         email = self.cleaned_data.get('email')
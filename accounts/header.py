@@ -0,0 +1,29 @@
+from django.core.cache import cache
+
+from accounts.models import Profile
+
+HEADER_CACHE_PREFIX = 'accounts.header'
+HEADER_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def header_cache_key(user_id):
+    return f'{HEADER_CACHE_PREFIX}:{user_id}'
+
+
+def header_snapshot(user):
+    # The navbar's avatar for a signed-in user. Only the file name is cached (and dropped by
+    # accounts.signals when it changes); the markup is rendered per request, so static and
+    # thumbnail URLs always match the current deploy.
+    if not user.is_authenticated:
+        return None
+    key = header_cache_key(user.pk)
+    name = cache.get(key)
+    if name is None:
+        name = Profile.objects.filter(user_id=user.pk).values_list('profile_picture', flat=True).first() or ''
+        cache.set(key, name, HEADER_CACHE_TIMEOUT)
+    field = Profile._meta.get_field('profile_picture')
+    return {'avatar': field.attr_class(None, field, name or None)}
+
+
+def forget_header(user_id):
+    cache.delete(header_cache_key(user_id))
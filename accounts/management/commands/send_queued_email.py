@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.utils import OUTBOX_MAX_ATTEMPTS, deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outgoing email in batches, retrying failures with exponential backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=OUTBOX_MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = deliver_queued_emails(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+            if any(stats.values()):
+                self.stdout.write(f"sent {stats['sent']}, retrying {stats['retry']}, dead {stats['dead']}")
+            if not options['loop']:
+                return
+            if stats['sent'] + stats['retry'] + stats['dead'] < options['batch_size']:
+                time.sleep(options['interval'])
@@ -1,3 +1,146 @@
-from django.test import TestCase
+from io import StringIO
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.header import header_cache_key
+from accounts.models import OutgoingEmail, Profile
+from accounts.utils import backoff_delay, deliver_queued_emails, queue_email
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('smtp down')
+
+
+class OutgoingEmailTests(TestCase):
+    def test_register_queues_activation_mail_without_sending(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'newcomer',
+            'email': 'newcomer@example.com',
+            'password1': 'Sup3r-secret-pass',
+            'password2': 'Sup3r-secret-pass',
+        })
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.to, ['newcomer@example.com'])
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+
+    def test_worker_sends_due_mail(self):
+        queue_email('Hello', 'Body', ['a@example.com'])
+        queue_email('Hello again', 'Body', ['b@example.com'])
+        self.assertEqual(deliver_queued_emails(), {'sent': 2, 'retry': 0, 'dead': 0})
+        self.assertEqual([m.to for m in mail.outbox], [['a@example.com'], ['b@example.com']])
+        self.assertFalse(OutgoingEmail.objects.exclude(status=OutgoingEmail.SENT).exists())
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+    def test_command_delivers_queue(self):
+        queue_email('Hello', 'Body', ['a@example.com'])
+        call_command('send_queued_email', verbosity=0, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.FailingBackend')
+    def test_failure_is_retried_with_backoff(self):
+        email = queue_email('Hello', 'Body', ['a@example.com'])
+        before = timezone.now()
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 1, 'dead': 0})
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('smtp down', email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, before + backoff_delay(1))
+        # Not due yet, so the next run leaves it alone.
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.FailingBackend')
+    def test_mail_is_dead_after_max_attempts(self):
+        email = queue_email('Hello', 'Body', ['a@example.com'])
+        OutgoingEmail.objects.filter(pk=email.pk).update(attempts=2)
+        self.assertEqual(deliver_queued_emails(max_attempts=3), {'sent': 0, 'retry': 0, 'dead': 1})
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.DEAD)
+
+    def expire_lease(self, email, attempts=0):
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            status=OutgoingEmail.SENDING, attempts=attempts, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_expired_lease_is_reclaimed_as_an_attempt(self):
+        email = queue_email('Hello', 'Body', ['a@example.com'])
+        self.expire_lease(email)
+        before = timezone.now()
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 1, 'dead': 0})
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreaterEqual(email.next_attempt_at, before + backoff_delay(1))
+        OutgoingEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_queued_emails()['sent'], 1)
+
+    def test_repeatedly_expired_lease_is_dead(self):
+        email = queue_email('Hello', 'Body', ['a@example.com'])
+        self.expire_lease(email, attempts=2)
+        self.assertEqual(deliver_queued_emails(max_attempts=3), {'sent': 0, 'retry': 0, 'dead': 1})
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.DEAD)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_backoff_is_capped(self):
+        self.assertEqual(backoff_delay(1), timedelta(minutes=1))
+        self.assertEqual(backoff_delay(3), timedelta(minutes=4))
+        self.assertEqual(backoff_delay(30), timedelta(hours=6))
+
+
+class HeaderSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer', password='secret-pass')
+        cls.profile = Profile.objects.create(user=cls.user, birth_date='1990-01-01')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def profile_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('about'))
+        return response, [query['sql'] for query in queries if 'accounts_profile' in query['sql']]
+
+    def test_warm_navbar_skips_the_profile_query(self):
+        response, cold = self.profile_queries()
+        self.assertEqual(len(cold), 1)
+        self.assertContains(response, reverse('profile', args=['writer']))
+        self.assertContains(response, 'img/menu.jpg')
+        response, warm = self.profile_queries()
+        self.assertEqual(warm, [])
+        self.assertContains(response, 'rounded-circle')
+
+    def test_profile_changes_refresh_the_snapshot(self):
+        self.profile_queries()
+        self.profile.profile_picture = 'profile/profile_pictures/me.jpg'
+        self.profile.save()
+        self.assertIsNone(cache.get(header_cache_key(self.user.pk)))
+        response, _ = self.profile_queries()
+        self.assertContains(response, 'thumbs/profile/profile_pictures/me-50.webp')
+
+    def test_only_the_file_name_is_cached(self):
+        self.profile_queries()
+        self.assertEqual(cache.get(header_cache_key(self.user.pk)), '')
+        # Markup is rendered per request, so a new static or media location applies at once.
+        with override_settings(MEDIA_URL='/cdn/media/'):
+            self.profile.profile_picture = 'profile/profile_pictures/me.jpg'
+            self.profile.save()
+            self.profile_queries()
+            response, queries = self.profile_queries()
+        self.assertEqual(queries, [])
+        self.assertContains(response, '/cdn/media/thumbs/profile/profile_pictures/me-50.jpg')
@@ -1,16 +1,87 @@
-from django.core.mail import EmailMessage
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
-def send_email(subject, body, to_email_list):
-    from_email = settings.DEFAULT_FROM_EMAIL
+from django.utils import timezone
+
+from accounts.models import OutgoingEmail
+
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_SECONDS = 60
+OUTBOX_MAX_BACKOFF_SECONDS = 60 * 60 * 6
+# A message left in "sending" longer than this is assumed to belong to a dead worker.
+OUTBOX_LEASE_SECONDS = 60 * 10
+
+
+def queue_email(subject, body, to_email_list):
+    return OutgoingEmail.objects.create(subject=subject, body=body, to=list(to_email_list))
+
+
+def backoff_delay(attempts):
+    return timedelta(seconds=min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+def reclaim_expired_leases(now, stats, max_attempts=OUTBOX_MAX_ATTEMPTS):
+    # An expired lease means the worker died mid-send, which counts as a failed attempt; a
+    # message that keeps crashing workers then backs off and is eventually given up on.
+    expired = OutgoingEmail.objects.filter(status=OutgoingEmail.SENDING, next_attempt_at__lte=now)
+    for pk, attempts in expired.values_list('pk', 'attempts'):
+        changes = {'attempts': attempts + 1, 'last_error': 'Lease expired before delivery finished'}
+        if attempts + 1 >= max_attempts:
+            changes['status'] = OutgoingEmail.DEAD
+            outcome = 'dead'
+        else:
+            changes.update(status=OutgoingEmail.PENDING, next_attempt_at=now + backoff_delay(attempts + 1))
+            outcome = 'retry'
+        # Matching on attempts too, so two workers reclaiming at once count it only once.
+        if expired.filter(pk=pk, attempts=attempts).update(**changes):
+            stats[outcome] += 1
+
+
+def deliver_queued_emails(batch_size=50, max_attempts=OUTBOX_MAX_ATTEMPTS):
+    now = timezone.now()
+    stats = {'sent': 0, 'retry': 0, 'dead': 0}
+    reclaim_expired_leases(now, stats, max_attempts)
+    due = (
+        OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    lease = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    claimed = [
+        pk for pk in due
+        if OutgoingEmail.objects.filter(pk=pk, status=OutgoingEmail.PENDING)
+        .update(status=OutgoingEmail.SENDING, next_attempt_at=lease)
+    ]
+    if not claimed:
+        return stats
+
+    connection = get_connection()
     try:
-        email = EmailMessage(
-            subject,
-            body,
-            from_email,
-            to_email_list
-        )
-        email.send()
-        return True
-    except Exception as e:
-        print(e)
-        return False
\ No newline at end of file
+        connection.open()
+    except Exception:
+        # Reconnection is retried by each send below, which records the failure per message.
+        pass
+    try:
+        for email in OutgoingEmail.objects.filter(pk__in=claimed).order_by('pk'):
+            email.attempts += 1
+            try:
+                EmailMessage(email.subject, email.body, settings.DEFAULT_FROM_EMAIL, email.to,
+                             connection=connection).send()
+            except Exception as e:
+                email.last_error = f'{type(e).__name__}: {e}'
+                if email.attempts >= max_attempts:
+                    email.status = OutgoingEmail.DEAD
+                    stats['dead'] += 1
+                else:
+                    email.status = OutgoingEmail.PENDING
+                    email.next_attempt_at = timezone.now() + backoff_delay(email.attempts)
+                    stats['retry'] += 1
+            else:
+                email.status = OutgoingEmail.SENT
+                email.sent_at = timezone.now()
+                stats['sent'] += 1
+            email.save(update_fields=['attempts', 'status', 'next_attempt_at', 'last_error', 'sent_at'])
+    finally:
+        connection.close()
+    return stats
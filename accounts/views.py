@@ -14,7 +14,7 @@ from django_six import force_text
 from accounts.forms import LoginForm, RegistrationForm, UserForm, ProfileForm, CustomPasswordResetForm
 from accounts.models import Profile
 from accounts.token import account_activation_token
-from .utils import send_email
+from .utils import queue_email
 from django.contrib.auth.tokens import default_token_generator
 
 
@@ -65,13 +65,9 @@ def register_view(request):
                 'token': account_activation_token.make_token(user),
             })
             to_email = [form.cleaned_data.get('email')] # Mailjet wait a list
-            if send_email(subject=mail_subject, body=message, to_email_list=to_email):
-                messages.success(request, f"Registration Successful. An activation link has been sent to {form.cleaned_data.get('email')}")
-                return HttpResponseRedirect(reverse('login'))
-            else:
-                user.delete()
-                messages.error(request, 'Failed to send activation email. Please try again.')
-                return HttpResponseRedirect(reverse('register'))
+            queue_email(subject=mail_subject, body=message, to_email_list=to_email)
+            messages.success(request, f"Registration Successful. An activation link has been sent to {form.cleaned_data.get('email')}")
+            return HttpResponseRedirect(reverse('login'))
         else:
             for error in form.errors.values():
                 messages.error(request, error.as_text())
@@ -214,11 +210,9 @@ def password_reset_view(request):
                 'token': default_token_generator.make_token(user),
             })
             to_email = [form.cleaned_data['email']]
-            if send_email(subject=mail_subject, body=message, to_email_list=to_email):
-                messages.success(request, "Your password reset link has been sent successfully. Please check your email.")
-                return HttpResponseRedirect(reverse('login'))
-            else:
-                messages.error(request, "Your password reset link is invalid. Please try again.")
+            queue_email(subject=mail_subject, body=message, to_email_list=to_email)
+            messages.success(request, "Your password reset link has been sent successfully. Please check your email.")
+            return HttpResponseRedirect(reverse('login'))
         else:
             for error in form.errors.values():
                 messages.error(request, error.as_text())
@@ -1,10 +1,53 @@
 from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.utils.text import slugify
+
+from blogs import search
+from blogs.pagination import EstimatedCountPaginator
 from .models import Category, Page, Tag, Blog
 
 
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    # Sidebar filter backed by the admin autocomplete view: only the selected objects are
+    # loaded, instead of one link per related row. The related admin needs search_fields.
+    template = 'admin/blogs/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.app_label = model._meta.app_label
+        self.model_name = model._meta.model_name
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    @property
+    def include_empty_choice(self):
+        return False
+
+    def has_output(self):
+        return True
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+        related = field.remote_field.model._default_manager.filter(pk__in=self.lookup_val)
+        return [(obj.pk, str(obj)) for obj in related]
+
+
+class AutocompleteFilterMedia:
+    js = (
+        'admin/js/vendor/jquery/jquery.js',
+        'admin/js/vendor/select2/select2.full.js',
+        'admin/js/jquery.init.js',
+        'admin/js/autocomplete.js',
+        'js/admin_autocomplete_filter.js',
+    )
+    css = {
+        'screen': ('admin/css/vendor/select2/select2.css', 'admin/css/autocomplete.css'),
+    }
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('title', 'slug')
+    list_display = ('title', 'slug', 'page_count')
     search_fields = ('title',)
     prepopulated_fields = {"slug": ("title",)}
     ordering = ('title',)
@@ -12,11 +55,33 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Page)
 class PageAdmin(admin.ModelAdmin):
-    list_display = ('creator', 'title', 'slug', 'is_private')
-    search_fields = ('title', 'creator__username')
-    list_filter = ('is_private', 'category')
+    list_display = ('creator', 'title', 'slug', 'is_private', 'blog_count')
+    list_select_related = ('creator',)
+    # Enables the search box and the autocomplete widgets; get_search_results does the matching.
+    search_fields = ('title', '=creator__username')
+    search_help_text = 'Searches the start of the title, or an exact creator username.'
+    list_filter = ('is_private', ('category', AutocompleteFilter))
+    autocomplete_fields = ('creator', 'category')
     prepopulated_fields = {"slug": ("title",)}
     ordering = ('title',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    Media = AutocompleteFilterMedia
+
+    def get_search_results(self, request, queryset, search_term):
+        # Title prefixes as ranges on the unique title and slug indexes (the slug makes the match
+        # case-insensitive), as in autocomplete_view: ^title compiles to LIKE ... ESCAPE, which
+        # SQLite answers with a full scan. The creator goes through a subquery, so every branch
+        # of the OR is an index search on blogs_page.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = Q(title__gte=search_term, title__lt=search_term + '\uffff')
+        condition |= Q(creator__in=User.objects.filter(username=search_term).values('pk'))
+        prefix = slugify(search_term)
+        if prefix:
+            condition |= Q(slug__gte=prefix, slug__lt=prefix + '\uffff')
+        return queryset.filter(condition), False
 
 
 @admin.register(Tag)
@@ -24,19 +89,34 @@ class TagAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'blog_count')
     search_fields = ('title',)
     prepopulated_fields = {"slug": ("title",)}
-
-    def blog_count(self, obj):
-        return obj.blog_set.count()
-
-    blog_count.short_description = 'Blog Count'
     ordering = ('title',)
 
 
 @admin.register(Blog)
 class BlogAdmin(admin.ModelAdmin):
     list_display = ('title', 'subtitle', 'author', 'page', 'is_published', 'is_private', 'created_at', 'updated_at')
-    search_fields = ('title', 'subtitle', 'author__username', 'content')
-    list_filter = ('is_published', 'is_private', 'tags', 'page')
+    list_select_related = ('author', 'page')
+    # Fallback for databases without the full-text index; see get_search_results.
+    search_fields = ('title', 'subtitle', '=author__username')
+    search_help_text = 'Searches title, subtitle, content, tags and page through the full-text index, or an exact author username.'
+    list_filter = (
+        'is_published',
+        'is_private',
+        ('tags', AutocompleteFilter),
+        ('page', AutocompleteFilter),
+        ('author', AutocompleteFilter),
+    )
+    autocomplete_fields = ('author', 'page', 'tags')
     prepopulated_fields = {"slug": ("title",)}
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    Media = AutocompleteFilterMedia
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        condition = search.match_condition(search_term) | Q(author__username=search_term)
+        return queryset.filter(condition), False
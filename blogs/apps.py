@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BlogsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blogs'
+
+    def ready(self):
+        from blogs import checks, signals  # noqa: F401
+        from BlogWebSiteWithDjango import database  # noqa: F401
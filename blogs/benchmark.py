@@ -0,0 +1,100 @@
+import json
+import math
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Profile
+from blogs.models import Blog, Category, Tag
+
+BASELINE_PATH = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+PERCENTILES = (50, 95, 99)
+# Latency may exceed the baseline by this fraction before a run fails; query counts may not grow at all.
+DEFAULT_TOLERANCE = 0.5
+
+
+def benchmark_urls():
+    # One URL per hot view, pointed at the busiest rows of the current database.
+    blog = Blog.objects.public().select_related('page').order_by('-created_at', 'id').first()
+    tag = Tag.objects.filter(blog__in=Blog.objects.public()).order_by('-blog_count', 'pk').first()
+    category = Category.objects.filter(page__is_private=False).order_by('-page_count', 'pk').first()
+    profile = Profile.objects.select_related('user').annotate(blogs=Count('user__blog')).order_by('-blogs', 'pk').first()
+    if not all((blog, tag, category, profile)):
+        return None
+    return {
+        'index': reverse('index'),
+        'search_index': reverse('searchIndex') + f'?q={blog.title.split()[0]}',
+        'page_detail_view': reverse('page_detail', args=[blog.page.slug]),
+        'blog_detail_view': reverse('blog_detail', args=[blog.page.slug, blog.slug]),
+        'tag_view': reverse('tags', args=[tag.slug]),
+        'category_view': reverse('category', args=[category.slug]),
+        'profile_view': reverse('profile', args=[profile.user.username]),
+    }
+
+
+def percentile(samples, pct):
+    # Nearest-rank percentile.
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def measure(client, url, iterations, warmup):
+    for _ in range(warmup):
+        client.get(url)
+    # Counted once, separately: capturing queries slows every one of them down.
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    # Read now: the next request_started signal clears the connection's query log.
+    result = {'queries': len(queries.captured_queries)}
+    if response.status_code != 200:
+        raise AssertionError(f'GET {url} returned {response.status_code}')
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    for pct in PERCENTILES:
+        result[f'p{pct}_ms'] = round(percentile(timings, pct), 2)
+    return result
+
+
+def run_benchmarks(urls, iterations=30, warmup=2, page_cache=False):
+    # Anonymous requests through the test client, with each view's caches warmed first. The
+    # full-page cache is off unless asked for; otherwise every view would time as a cache hit.
+    client = Client()
+    page_cache_timeout = settings.PAGE_CACHE_TIMEOUT if page_cache else 0
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], PAGE_CACHE_TIMEOUT=page_cache_timeout):
+        return {name: measure(client, url, iterations, warmup) for name, url in urls.items()}
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as baseline:
+        return json.load(baseline)
+
+
+def save_baseline(results, path=BASELINE_PATH, **corpus):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as baseline:
+        json.dump({'corpus': corpus, 'views': results}, baseline, indent=2, sort_keys=True)
+        baseline.write('\n')
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, latency=True):
+    # Budget violations as readable strings; empty when the run is within budget.
+    failures = []
+    for name, result in results.items():
+        budget = baseline['views'].get(name)
+        if budget is None:
+            continue
+        if result['queries'] > budget['queries']:
+            failures.append(f'{name}: {result["queries"]} queries, budget {budget["queries"]}')
+        if latency and 'p95_ms' in budget:
+            allowed = budget['p95_ms'] * (1 + tolerance)
+            if result['p95_ms'] > allowed:
+                failures.append(f'{name}: p95 {result["p95_ms"]:.1f}ms, budget {allowed:.1f}ms')
+    return failures
@@ -0,0 +1,32 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from blogs.thumbnails import picture
+
+CARD_TEMPLATE = 'blogs/partials/_blog_card.html'
+# Bump when _blog_card.html changes so cards rendered by the old template are never reused.
+CARD_TEMPLATE_VERSION = 4
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Stands in for the page image in cached cards. Static and thumbnail URLs change with each
+# deploy, so the image is rendered per request instead of being kept for a day.
+CARD_IMAGE = '<!-- card image -->'
+
+
+def card_cache_key(blog):
+    return f'blogs.card:{CARD_TEMPLATE_VERSION}:{blog.pk}:{blog.version}'
+
+
+def render_cards(blogs):
+    keyed = [(card_cache_key(blog), blog) for blog in blogs]
+    cards = cache.get_many([key for key, _ in keyed])
+    missing = {}
+    for key, blog in keyed:
+        if key not in cards:
+            cards[key] = missing[key] = render_to_string(CARD_TEMPLATE, {'blog': blog})
+    if missing:
+        cache.set_many(missing, CARD_CACHE_TIMEOUT)
+    return mark_safe(''.join(
+        cards[key].replace(CARD_IMAGE, picture(blog.page.image, 30, default='img/menu.jpg', alt='Page'), 1)
+        for key, blog in keyed
+    ))
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    # The content generation lives in the default cache; each process of a local-memory cache
+    # has its own, so a write only retires the pages, feeds and ETags of the worker that made it.
+    if settings.CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [Warning(
+        'The default cache is local to each process, so other workers keep serving stale pages.',
+        hint='Use FileBasedCache, Redis or memcached for CACHE_BACKEND.',
+        id='blogs.W001',
+    )]
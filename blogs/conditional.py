@@ -0,0 +1,95 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from BlogWebSiteWithDjango.database import has_pending_messages
+from blogs.models import Blog, Page
+
+CONTENT_GENERATION_KEY = 'blogs.content_generation'
+
+
+def _fresh_generation():
+    # Starts from the clock so a flushed cache never reissues an old generation.
+    return int(time.time() * 1000)
+
+
+def content_generation():
+    # Bumped by signals on every content change, deletes included, which MAX(updated_at) misses.
+    generation = cache.get(CONTENT_GENERATION_KEY)
+    if generation is None:
+        cache.add(CONTENT_GENERATION_KEY, _fresh_generation(), None)
+        generation = cache.get(CONTENT_GENERATION_KEY)
+    return generation
+
+
+def bump_content_generation():
+    try:
+        cache.incr(CONTENT_GENERATION_KEY)
+    except ValueError:
+        cache.set(CONTENT_GENERATION_KEY, _fresh_generation(), None)
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def viewer_state(request):
+    # Pages render the navbar, owner-only buttons and a CSRF token for signed-in users, so the
+    # user and their CSRF secret are part of every ETag.
+    if not request.user.is_authenticated:
+        return 'anon'
+    return f"user:{request.user.pk}:{request.META.get('CSRF_COOKIE', '')}"
+
+
+def conditional_page(etag_func=None, last_modified_func=None):
+    # django.views.decorators.http.condition, except that responses carrying flash messages
+    # are always rendered (a 304 would swallow them) and personalised pages stay private.
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if has_pending_messages(request):
+                response = view(request, *args, **kwargs)
+            else:
+                response = conditional_view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _blog_probe(request, page_slug, blog_slug):
+    # Through the visibility querysets, so a hidden blog gets no validators and falls through
+    # to the view's 404 instead of answering 304 (which would confirm it exists).
+    if not hasattr(request, '_blog_probe'):
+        blog = Blog.objects.visible_to(request.user).filter(slug=blog_slug).values('version', 'updated_at').first()
+        page = Page.objects.visible_to(request.user).filter(slug=page_slug).values('version', 'blog_count').first()
+        request._blog_probe = (blog, page)
+    return request._blog_probe
+
+
+def blog_detail_etag(request, page_slug, blog_slug):
+    blog, page = _blog_probe(request, page_slug, blog_slug)
+    if blog is None or page is None:
+        return None
+    return make_etag('blog', blog['version'], page['version'], page['blog_count'], viewer_state(request))
+
+
+def blog_detail_last_modified(request, page_slug, blog_slug):
+    blog, page = _blog_probe(request, page_slug, blog_slug)
+    return blog['updated_at'] if blog and page else None
+
+
+def listing_etag(request, *args, **kwargs):
+    latest = Blog.objects.aggregate(latest=Max('updated_at'))['latest']
+    return make_etag('listing', content_generation(), latest, request.get_full_path(), viewer_state(request))
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from blogs.counters import tag_cloud
+
+
+def popular(request):
+    # Lazy, so only templates that actually show the cloud touch the cache.
+    return {'tag_cloud': SimpleLazyObject(tag_cloud)}
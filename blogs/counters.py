@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from blogs.models import Blog, Category, Page, Tag
+
+TAG_CLOUD_SIZE = 20
+POPULAR_CATEGORIES_SIZE = 10
+TAG_CLOUD_CACHE_KEY = 'blogs.tag_cloud'
+TAG_CLOUD_TIMEOUT = 60 * 10
+
+
+def counter_specs():
+    # (model, counter field, reverse relation used by Count(), (row model, FK to the counted model))
+    return (
+        (Tag, 'blog_count', 'blog', (Blog.tags.through, 'tag')),
+        (Page, 'blog_count', 'blog', (Blog, 'page')),
+        (Category, 'page_count', 'page', (Page.category.through, 'category')),
+    )
+
+
+def count_subquery(rows, fk):
+    counts = rows.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counts), 0)
+
+
+def reconcile_counters():
+    # Drifted rows are found with one grouped query per model, then fixed by a single UPDATE
+    # that recounts inside the statement, so increments racing with the repair are not lost.
+    fixed = {}
+    for model, field, relation, (rows, fk) in counter_specs():
+        drifted = list(
+            model.objects.annotate(actual=Count(relation)).exclude(**{field: F('actual')}).values_list('pk', flat=True)
+        )
+        if drifted:
+            model.objects.filter(pk__in=drifted).update(**{field: count_subquery(rows, fk)})
+        fixed[model._meta.label] = len(drifted)
+    return fixed
+
+
+def tag_cloud():
+    cloud = cache.get(TAG_CLOUD_CACHE_KEY)
+    if cloud is None:
+        # The cloud is shared by every visitor, so it ranks and counts public content only;
+        # the denormalized totals include private and unpublished posts. One grouped count
+        # per rebuild, which the cache spreads over TAG_CLOUD_TIMEOUT.
+        public_blogs = Q(blog__is_published=True, blog__is_private=False, blog__page__is_private=False)
+        cloud = {
+            'tags': list(
+                Tag.objects.annotate(public_count=Count('blog', filter=public_blogs))
+                .filter(public_count__gt=0)
+                .order_by('-public_count', 'title')
+                .values('title', 'slug', 'public_count')[:TAG_CLOUD_SIZE]
+            ),
+            'categories': list(
+                Category.objects.annotate(public_count=Count('page', filter=Q(page__is_private=False)))
+                .filter(public_count__gt=0)
+                .order_by('-public_count', 'title')
+                .values('title', 'slug', 'public_count')[:POPULAR_CATEGORIES_SIZE]
+            ),
+        }
+        cache.set(TAG_CLOUD_CACHE_KEY, cloud, TAG_CLOUD_TIMEOUT)
+    return cloud
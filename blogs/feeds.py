@@ -0,0 +1,154 @@
+from django.contrib.auth.models import User
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from BlogWebSiteWithDjango.database import replica_reads
+from blogs.conditional import content_generation, make_etag
+from blogs.models import Blog, Page, Tag
+
+FEED_SIZE = 20
+FEED_CACHE_PREFIX = 'blogs.feed'
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# How long pollers may reuse a feed without revalidating.
+FEED_MAX_AGE = 60 * 5
+
+
+class LatestBlogsFeed(Feed):
+    title = 'Latest posts'
+    description = 'The newest posts from every page.'
+
+    def link(self, obj=None):
+        return reverse('index')
+
+    def blogs(self, obj):
+        return Blog.objects.public().feed()
+
+    def items(self, obj=None):
+        return self.blogs(obj)[:FEED_SIZE]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_link(self, item):
+        return reverse('blog_detail', args=[item.page.slug, item.slug])
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_categories(self, item):
+        return [tag.title for tag in item.tags.all()]
+
+
+class PageFeed(LatestBlogsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Page.objects.public(), slug=slug)
+
+    def title(self, obj):
+        return obj.title
+
+    def description(self, obj):
+        return f'The newest posts on {obj.title}.'
+
+    def link(self, obj):
+        return reverse('page_detail', args=[obj.slug])
+
+    def blogs(self, obj):
+        return super().blogs(obj).filter(page=obj)
+
+
+class TagFeed(LatestBlogsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Tag, slug=slug)
+
+    def title(self, obj):
+        return f'Posts tagged {obj.title}'
+
+    def description(self, obj):
+        return f'The newest posts tagged {obj.title}.'
+
+    def link(self, obj):
+        return reverse('tags', args=[obj.slug])
+
+    def blogs(self, obj):
+        return super().blogs(obj).filter(tags=obj)
+
+
+class AuthorFeed(LatestBlogsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Posts by {obj.username}'
+
+    def description(self, obj):
+        return f'The newest posts by {obj.username}.'
+
+    def link(self, obj):
+        return reverse('profile', args=[obj.username])
+
+    def blogs(self, obj):
+        return super().blogs(obj).filter(author=obj)
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class LatestBlogsAtomFeed(AtomMixin, LatestBlogsFeed):
+    pass
+
+
+class PageAtomFeed(AtomMixin, PageFeed):
+    pass
+
+
+class TagAtomFeed(AtomMixin, TagFeed):
+    pass
+
+
+class AuthorAtomFeed(AtomMixin, AuthorFeed):
+    pass
+
+
+def feed_variant(request):
+    # Feed bodies hold absolute links built from the request, so each scheme and host gets
+    # its own copy.
+    return make_etag(request.scheme, request.get_host(), request.path)
+
+
+def feed_etag(request, **kwargs):
+    return make_etag('feed', content_generation(), feed_variant(request))
+
+
+def cached_feed(feed):
+    # Rendered feeds are cached per content generation, so any publish (or edit/delete)
+    # invalidates every feed at once; pollers holding the ETag get a 304.
+    @replica_reads
+    @cache_control(public=True, max_age=FEED_MAX_AGE)
+    @condition(etag_func=feed_etag)
+    def view(request, **kwargs):
+        key = f'{FEED_CACHE_PREFIX}:{content_generation()}:{feed_variant(request)}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = feed(request, **kwargs)
+        cache.set(key, (response.content, response['Content-Type']), FEED_CACHE_TIMEOUT)
+        return response
+
+    return view
@@ -1,18 +1,27 @@
 import django_filters
 
 from blogs.models import Blog, Category, Tag, Page
+from blogs.widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 
 class BlogFilter(django_filters.FilterSet):
+    # Not ``page``: that is the feeds' legacy page number, and cursor links drop it.
+    in_page = django_filters.ModelChoiceFilter(
+        queryset=Page.objects.all(),
+        field_name='page',
+        label='Page',
+        widget=AutocompleteSelect('pages'),
+    )
     tags = django_filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
         to_field_name='slug',
         field_name='tags__slug',
         label='Tags',
+        widget=AutocompleteSelectMultiple('tags'),
     )
     class Meta:
         model = Blog
-        fields = ['page','tags']
+        fields = ['in_page','tags']
 
 class PageFilter(django_filters.FilterSet):
     category = django_filters.ModelMultipleChoiceFilter(
@@ -20,6 +29,7 @@ class PageFilter(django_filters.FilterSet):
         to_field_name='slug',
         field_name='category__slug',
         label='Categories',
+        widget=AutocompleteSelectMultiple('categories'),
     )
     is_private = django_filters.BooleanFilter(
         field_name='is_private',
@@ -1,5 +1,7 @@
 from django import forms
 from blogs.models import Page, Tag, Blog
+from blogs.thumbnails import normalize_upload
+from blogs.widgets import AutocompleteSelectMultiple
 from ckeditor.widgets import CKEditorWidget
 
 class PageForm(forms.ModelForm):
@@ -18,6 +20,9 @@ class PageForm(forms.ModelForm):
             'is_private': forms.CheckboxInput(attrs={'class': 'form-control mb-3'}),
         }
 
+    def clean_image(self):
+        return normalize_upload(self.cleaned_data.get('image'))
+
 class TagForm(forms.ModelForm):
     title = forms.CharField(
         required=True,
@@ -38,10 +43,10 @@ class BlogForm(forms.ModelForm):
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control mb-3'}),
             'subtitle': forms.TextInput(attrs={'class': 'form-control mb-3'}),
-            'tags': forms.SelectMultiple(attrs={'class': 'form-control mb-3', 'id': 'id_tag'}),
+            'tags': AutocompleteSelectMultiple('tags', attrs={'class': 'form-control mb-3', 'id': 'id_tag'}),
             'content': CKEditorWidget(attrs={'class': 'form-control mb-3'}),
             'is_private': forms.CheckboxInput(attrs={'class': 'form-control mb-3'}),
-        },
+        }
         error_messages = {
             'title': {'required': 'Title is required'},
             'subtitle': {'required': 'Subtitle is required'},
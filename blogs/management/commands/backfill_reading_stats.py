@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from blogs.models import Blog
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored excerpt, word count and reading time of every blog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+        while True:
+            blogs = list(Blog.objects.filter(pk__gt=last_id).order_by('pk').only('content')[:batch_size])
+            if not blogs:
+                break
+            for blog in blogs:
+                blog.update_reading_stats()
+            Blog.objects.bulk_update(blogs, ['excerpt', 'word_count', 'reading_time'])
+            Blog.objects.filter(pk__in=[blog.pk for blog in blogs]).bump_version()
+            updated += len(blogs)
+            last_id = blogs[-1].pk
+            self.stdout.write(f'{updated} blogs updated')
+        self.stdout.write(self.style.SUCCESS(f'Backfilled reading stats for {updated} blogs.'))
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogs import benchmark
+from blogs.models import Blog
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the hot views through the test client against the current database (see seed_content) '
+        'and fail when query counts or p95 latency exceed the stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--baseline', type=Path, default=benchmark.BASELINE_PATH)
+        parser.add_argument('--tolerance', type=float, default=benchmark.DEFAULT_TOLERANCE)
+        parser.add_argument('--queries-only', action='store_true', help='Check query budgets only; latency depends on the machine.')
+        parser.add_argument('--page-cache', action='store_true', help='Time with the full-page cache on (mostly hits).')
+        parser.add_argument('--update-baseline', action='store_true', help='Write this run as the new baseline.')
+
+    def handle(self, *args, **options):
+        if options['page_cache'] and options['update_baseline']:
+            raise CommandError('The baseline is recorded without the page cache; drop --page-cache.')
+        urls = benchmark.benchmark_urls()
+        if urls is None:
+            raise CommandError('Not enough content to benchmark; run seed_content first.')
+        results = benchmark.run_benchmarks(urls, options['iterations'], options['warmup'], options['page_cache'])
+        self.stdout.write(f'{"view":<18} {"queries":>7} ' + ' '.join(f'{f"p{p}":>8}' for p in benchmark.PERCENTILES))
+        for name, result in results.items():
+            latencies = ' '.join(f'{result[f"p{p}_ms"]:>6.1f}ms' for p in benchmark.PERCENTILES)
+            self.stdout.write(f'{name:<18} {result["queries"]:>7} {latencies}')
+
+        if options['update_baseline']:
+            benchmark.save_baseline(results, options['baseline'], blogs=Blog.objects.count(), iterations=options['iterations'])
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {options["baseline"]}.'))
+            return
+        try:
+            baseline = benchmark.load_baseline(options['baseline'])
+        except FileNotFoundError:
+            raise CommandError(f'No baseline at {options["baseline"]}; run with --update-baseline first.')
+        failures = benchmark.compare(results, baseline, options['tolerance'], latency=not options['queries_only'])
+        if failures:
+            raise CommandError('Budget exceeded:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All views within budget.'))
@@ -0,0 +1,71 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from blogs.models import Blog, Category, Page, Tag
+
+
+class Command(BaseCommand):
+    help = 'Stream categories, tags, pages and blogs to a JSONL file, one record per line.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help='Output file, or "-" for stdout.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def records(self, chunk_size):
+        for category in Category.objects.order_by('pk').iterator(chunk_size=chunk_size):
+            yield {'model': 'category', 'title': category.title, 'slug': category.slug}
+        for tag in Tag.objects.order_by('pk').iterator(chunk_size=chunk_size):
+            yield {'model': 'tag', 'title': tag.title, 'slug': tag.slug}
+        pages = (
+            Page.objects.select_related('creator')
+            .prefetch_related(Prefetch('category', queryset=Category.objects.only('title')))
+            .order_by('pk')
+        )
+        for page in pages.iterator(chunk_size=chunk_size):
+            yield {
+                'model': 'page',
+                'title': page.title,
+                'slug': page.slug,
+                'creator': page.creator.username,
+                'categories': [category.title for category in page.category.all()],
+                'image': page.image.name or None,
+                'is_private': page.is_private,
+            }
+        blogs = (
+            Blog.objects.select_related('page', 'author')
+            .prefetch_related(Prefetch('tags', queryset=Tag.objects.only('title')))
+            .order_by('pk')
+        )
+        for blog in blogs.iterator(chunk_size=chunk_size):
+            yield {
+                'model': 'blog',
+                'title': blog.title,
+                'subtitle': blog.subtitle,
+                'slug': blog.slug,
+                'page': blog.page.title,
+                'author': blog.author.username,
+                'tags': [tag.title for tag in blog.tags.all()],
+                'content': blog.content,
+                'created_at': blog.created_at.isoformat(),
+                'updated_at': blog.updated_at.isoformat(),
+                'is_published': blog.is_published,
+                'is_private': blog.is_private,
+            }
+
+    def handle(self, *args, **options):
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+        started = time.monotonic()
+        written = 0
+        try:
+            for record in self.records(options['chunk_size']):
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                written += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        elapsed = time.monotonic() - started
+        self.stderr.write(f'Exported {written} records in {elapsed:.1f}s ({written / max(elapsed, 1e-6):.0f}/s).')
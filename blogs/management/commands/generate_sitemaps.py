@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blogs.sitemaps import ensure_all
+
+
+class Command(BaseCommand):
+    help = 'Write sitemap shards to SITEMAP_ROOT, regenerating only the shards whose content changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', required=True, help='Site root used in <loc>, e.g. https://example.com')
+
+    def handle(self, *args, **options):
+        shards = ensure_all(options['base_url'].rstrip('/'))
+        for section, number, meta in shards:
+            self.stdout.write(f'{section}-{number}.xml: {meta["urls"]} urls')
+        self.stdout.write(self.style.SUCCESS(f'{len(shards)} sitemap shards up to date.'))
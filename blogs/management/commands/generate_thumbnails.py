@@ -0,0 +1,24 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from blogs import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Create missing thumbnails for existing page images and profile pictures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate thumbnails that already exist.')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        created = 0
+        for label, field in thumbnails.THUMBNAIL_FIELDS:
+            model = apps.get_model(label)
+            images = (
+                model._default_manager.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                .only('pk', field).order_by('pk')
+            )
+            for instance in images.iterator(chunk_size=options['chunk_size']):
+                created += thumbnails.generate_thumbnails(getattr(instance, field), overwrite=options['force'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} thumbnails.'))
@@ -0,0 +1,187 @@
+import json
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from blogs import search
+from blogs.conditional import bump_content_generation
+from blogs.counters import reconcile_counters
+from blogs.models import Blog, Category, Page, Tag
+from blogs.slugs import assign_slugs
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a JSONL file produced by export_content into the database in batches. '
+        'Progress is checkpointed after every committed batch so an interrupted import can --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <input>.checkpoint).')
+        parser.add_argument('--resume', action='store_true', help='Continue after the last committed batch.')
+
+    def handle(self, *args, **options):
+        self.checkpoint = options['checkpoint'] or f"{options['input']}.checkpoint"
+        offset = self.read_checkpoint() if options['resume'] else 0
+        if offset:
+            self.stdout.write(f'Resuming at byte {offset}.')
+        self.started = time.monotonic()
+        self.imported = 0
+        batch_size = options['batch_size']
+        importers = {
+            'category': self.import_categories,
+            'tag': self.import_tags,
+            'page': self.import_pages,
+            'blog': self.import_blogs,
+        }
+
+        batch, kind, batch_end = [], None, offset
+        with open(options['input'], 'rb') as source:
+            source.seek(offset)
+            for line in source:
+                offset += len(line)
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('model') not in importers:
+                    raise CommandError(f'Unknown record type at byte {offset - len(line)}: {record.get("model")!r}')
+                if batch and (record['model'] != kind or len(batch) >= batch_size):
+                    self.flush(importers[kind], kind, batch, batch_end)
+                    batch = []
+                kind = record['model']
+                batch.append(record)
+                batch_end = offset
+            if batch:
+                self.flush(importers[kind], kind, batch, batch_end)
+
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        # bulk_create skips the signals that maintain the denormalized counters and ETags.
+        reconcile_counters()
+        bump_content_generation()
+        self.stdout.write(self.style.SUCCESS(f'Imported {self.imported} records.'))
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint) as checkpoint:
+                return int(checkpoint.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, offset):
+        partial = f'{self.checkpoint}.tmp'
+        with open(partial, 'w') as checkpoint:
+            checkpoint.write(str(offset))
+        os.replace(partial, self.checkpoint)
+
+    def flush(self, importer, kind, records, end_offset):
+        with transaction.atomic():
+            created = importer(records)
+        self.write_checkpoint(end_offset)
+        self.imported += created
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f'{kind}: +{created} of {len(records)} '
+            f'(total {self.imported}, {self.imported / max(elapsed, 1e-6):.0f} rows/s)'
+        )
+
+    def lookup(self, model, field, values, label):
+        values = set(values)
+        found = model.objects.in_bulk(values, field_name=field)
+        missing = values - found.keys()
+        if missing:
+            raise CommandError(f'Unknown {label}: {", ".join(sorted(missing)[:10])}')
+        return found
+
+    def new_titled(self, model, records):
+        existing = set(model.objects.filter(title__in=[r['title'] for r in records]).values_list('title', flat=True))
+        fresh = {}
+        for record in records:
+            if record['title'] not in existing:
+                fresh.setdefault(record['title'], record)
+        return list(fresh.values())
+
+    def import_simple(self, model, records):
+        objs = [model(title=r['title'], slug=r.get('slug') or '') for r in self.new_titled(model, records)]
+        model.objects.bulk_create(assign_slugs(objs))
+        return len(objs)
+
+    def import_categories(self, records):
+        return self.import_simple(Category, records)
+
+    def import_tags(self, records):
+        return self.import_simple(Tag, records)
+
+    def import_pages(self, records):
+        records = self.new_titled(Page, records)
+        users = self.lookup(User, 'username', (r['creator'] for r in records), 'users')
+        categories = self.lookup(Category, 'title', (t for r in records for t in r.get('categories', [])), 'categories')
+        pages = [
+            Page(
+                creator=users[r['creator']],
+                title=r['title'],
+                slug=r.get('slug') or '',
+                image=r.get('image') or None,
+                is_private=r.get('is_private', False),
+            )
+            for r in records
+        ]
+        Page.objects.bulk_create(assign_slugs(pages))
+        Page.category.through.objects.bulk_create([
+            Page.category.through(page_id=page.pk, category_id=categories[title].pk)
+            for page, record in zip(pages, records)
+            for title in dict.fromkeys(record.get('categories', []))
+        ])
+        return len(pages)
+
+    def import_blogs(self, records):
+        # Rows whose exported slug and creation time are already present were committed by an
+        # earlier run whose checkpoint was not written; skipping them keeps --resume idempotent.
+        done = set(
+            Blog.objects.filter(slug__in=[r['slug'] for r in records if r.get('slug')])
+            .values_list('slug', 'created_at')
+        )
+        records = [
+            r for r in records
+            if (r.get('slug'), parse_datetime(r['created_at']) if r.get('created_at') else None) not in done
+        ]
+        users = self.lookup(User, 'username', (r['author'] for r in records), 'users')
+        pages = self.lookup(Page, 'title', (r['page'] for r in records), 'pages')
+        tags = self.lookup(Tag, 'title', (t for r in records for t in r.get('tags', [])), 'tags')
+        blogs = []
+        for record in records:
+            blog = Blog(
+                author=users[record['author']],
+                page=pages[record['page']],
+                title=record['title'],
+                subtitle=record['subtitle'],
+                slug=record.get('slug') or '',
+                content=record['content'],
+                is_published=record.get('is_published', True),
+                is_private=record.get('is_private', False),
+            )
+            blog.update_reading_stats()
+            blogs.append(blog)
+        Blog.objects.bulk_create(assign_slugs(blogs))
+
+        # bulk_create stamps auto_now(_add) fields; restore the exported timestamps afterwards.
+        dated = []
+        for blog, record in zip(blogs, records):
+            if record.get('created_at'):
+                blog.created_at = parse_datetime(record['created_at'])
+                blog.updated_at = parse_datetime(record.get('updated_at') or record['created_at'])
+                dated.append(blog)
+        Blog.objects.bulk_update(dated, ['created_at', 'updated_at'])
+        Blog.tags.through.objects.bulk_create([
+            Blog.tags.through(blog_id=blog.pk, tag_id=tags[title].pk)
+            for blog, record in zip(blogs, records)
+            for title in dict.fromkeys(record.get('tags', []))
+        ])
+        search.index_blogs([blog.pk for blog in blogs])
+        return len(blogs)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from blogs import pagecache
+
+
+class Command(BaseCommand):
+    help = 'Show hits, misses and bypasses of the anonymous full-page cache with their average latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them.')
+
+    def handle(self, *args, **options):
+        stats = pagecache.stats()
+        self.stdout.write(f'{"outcome":<8} {"requests":>9} {"avg":>10}')
+        for outcome in pagecache.OUTCOMES:
+            count, avg_ms = stats[outcome]['count'], stats[outcome]['avg_ms']
+            average = f'{avg_ms:.2f}ms' if avg_ms is not None else '-'
+            self.stdout.write(f'{outcome:<8} {count:>9} {average:>10}')
+        ratio = stats['hit_ratio']
+        self.stdout.write(f'hit ratio: {ratio:.1%}' if ratio is not None else 'hit ratio: no lookups yet')
+        if options['reset']:
+            pagecache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
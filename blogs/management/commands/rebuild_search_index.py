@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blogs import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for every blog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=search.INDEX_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Full-text search index requires the SQLite backend.')
+        indexed = search.rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} blogs.'))
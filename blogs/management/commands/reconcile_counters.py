@@ -0,0 +1,18 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from blogs.conditional import bump_content_generation
+from blogs.counters import TAG_CLOUD_CACHE_KEY, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount Tag.blog_count, Page.blog_count and Category.page_count and repair any drift.'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters()
+        for label, count in fixed.items():
+            self.stdout.write(f'{label}: {count} rows corrected')
+        if any(fixed.values()):
+            cache.delete(TAG_CLOUD_CACHE_KEY)
+            bump_content_generation()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled counters ({sum(fixed.values())} corrections).'))
@@ -0,0 +1,184 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Profile
+from blogs import search
+from blogs.conditional import bump_content_generation
+from blogs.counters import reconcile_counters
+from blogs.models import Blog, Category, Page, Tag
+from blogs.slugs import assign_slugs
+
+WORDS = (
+    'atom orbit signal vector kernel matrix proton photon cache socket thread buffer garden river '
+    'forest mountain harbor market engine rocket canvas melody rhythm poem novel recipe bread '
+    'coffee travel island desert winter summer autumn spring history empire museum theory proof '
+    'graph lattice planet comet galaxy nebula circuit sensor robot python django query index '
+    'memory latency network protocol packet server client render stream pixel shader texture'
+).split()
+JOBS = ('Engineer', 'Writer', 'Teacher', 'Designer', 'Researcher', 'Student', 'Photographer', None)
+SEED_PASSWORD = 'seed-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic corpus of users with profiles, categories, tags, pages and blogs for '
+        'load testing and benchmarks. Rows are bulk-inserted in batches; the same --seed gives the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blogs', type=int, default=10000, help='Number of blogs (10k to 1M is the intended range).')
+        parser.add_argument('--users', type=int, help='Default: one per 100 blogs, at least 5.')
+        parser.add_argument('--pages', type=int, help='Default: one per 50 blogs, at least 3.')
+        parser.add_argument('--tags', type=int, default=300)
+        parser.add_argument('--categories', type=int, default=25)
+        parser.add_argument('--private-ratio', type=float, default=0.05, help='Share of private blogs and pages.')
+        parser.add_argument('--draft-ratio', type=float, default=0.03, help='Share of unpublished blogs.')
+        parser.add_argument('--days', type=int, default=3 * 365, help='Spread creation dates over this many days.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed', help='Username and title prefix, so reruns can add more rows.')
+
+    def handle(self, *args, **options):
+        blogs = options['blogs']
+        if blogs < 1:
+            raise CommandError('--blogs must be positive.')
+        self.random = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        self.started = time.monotonic()
+        self.options = options
+
+        users = self.seed_users(options['users'] or max(5, blogs // 100))
+        categories = self.seed_titled(Category, options['categories'], 'Category')
+        tags = self.seed_titled(Tag, options['tags'], 'Tag')
+        pages = self.seed_pages(options['pages'] or max(3, blogs // 50), users, categories)
+        self.seed_blogs(blogs, users, pages, tags)
+
+        # bulk_create skips the signals that maintain the denormalized counters and ETags.
+        reconcile_counters()
+        bump_content_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users, {len(categories)} categories, {len(tags)} tags, '
+            f'{len(pages)} pages and {blogs} blogs in {time.monotonic() - self.started:.1f}s.'
+        ))
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def progress(self, label, done, total):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f'{label}: {done}/{total} ({elapsed:.1f}s)')
+
+    def words(self, count):
+        return ' '.join(self.random.choices(WORDS, k=count))
+
+    def run_id(self):
+        # Keeps titles and usernames unique when the command is run again with the same prefix.
+        return User.objects.filter(username__startswith=f'{self.prefix}-').count()
+
+    def seed_users(self, count):
+        password = make_password(SEED_PASSWORD)
+        offset = self.run_id()
+        users = []
+        for batch in self.batches(count):
+            with transaction.atomic():
+                created = User.objects.bulk_create([
+                    User(username=f'{self.prefix}-{offset + i}', email=f'{self.prefix}-{offset + i}@example.com',
+                         password=password, is_active=True)
+                    for i in batch
+                ])
+                Profile.objects.bulk_create([
+                    Profile(
+                        user=user,
+                        job=self.random.choice(JOBS),
+                        birth_date=date(1960, 1, 1) + timedelta(days=self.random.randrange(40 * 365)),
+                        bio=self.words(self.random.randint(5, 30)).capitalize(),
+                    )
+                    for user in created
+                ])
+            users.extend(user.pk for user in created)
+            self.progress('users', len(users), count)
+        return users
+
+    def seed_titled(self, model, count, label):
+        offset = model.objects.count()
+        objs = [
+            model(title=f'{self.random.choice(WORDS).capitalize()} {label.lower()} {offset + i}'[:50])
+            for i in range(count)
+        ]
+        model.objects.bulk_create(assign_slugs(objs), batch_size=self.batch_size)
+        self.progress(label.lower() + 's', count, count)
+        return [obj.pk for obj in objs]
+
+    def seed_pages(self, count, users, categories):
+        offset = Page.objects.count()
+        pages = []
+        for batch in self.batches(count):
+            objs = [
+                Page(
+                    creator_id=self.random.choice(users),
+                    title=f'{self.words(2).title()} {offset + i}'[:50],
+                    is_private=self.random.random() < self.options['private_ratio'],
+                )
+                for i in batch
+            ]
+            with transaction.atomic():
+                Page.objects.bulk_create(assign_slugs(objs))
+                Page.category.through.objects.bulk_create([
+                    Page.category.through(page_id=page.pk, category_id=category)
+                    for page in objs
+                    for category in self.random.sample(categories, min(len(categories), self.random.randint(1, 3)))
+                ])
+            pages.extend((page.pk, page.creator_id, page.is_private) for page in objs)
+            self.progress('pages', len(pages), count)
+        return pages
+
+    def content(self):
+        paragraphs = self.random.randint(3, 12)
+        return ''.join(f'<p>{self.words(self.random.randint(30, 90)).capitalize()}.</p>' for _ in range(paragraphs))
+
+    def seed_blogs(self, count, users, pages, tags):
+        offset = Blog.objects.count()
+        now = timezone.now()
+        span = self.options['days'] * 86400
+        done = 0
+        for batch in self.batches(count):
+            blogs = []
+            for i in batch:
+                page, creator, page_private = self.random.choice(pages)
+                blog = Blog(
+                    # Only a private page's creator can post to it.
+                    author_id=creator if page_private else self.random.choice(users),
+                    page_id=page,
+                    title=f'{self.words(self.random.randint(2, 4)).capitalize()} {offset + i}'[:50],
+                    subtitle=self.words(self.random.randint(6, 16)).capitalize(),
+                    content=self.content(),
+                    is_private=self.random.random() < self.options['private_ratio'],
+                    is_published=self.random.random() >= self.options['draft_ratio'],
+                )
+                blog.update_reading_stats()
+                blogs.append(blog)
+            with transaction.atomic():
+                Blog.objects.bulk_create(assign_slugs(blogs))
+                # bulk_create stamps auto_now(_add) fields; spread the dates out afterwards.
+                for blog in blogs:
+                    blog.created_at = now - timedelta(seconds=self.random.randrange(span))
+                    blog.updated_at = blog.created_at + timedelta(seconds=self.random.randrange(86400 * 30))
+                    blog.updated_at = min(blog.updated_at, now)
+                Blog.objects.bulk_update(blogs, ['created_at', 'updated_at'])
+                Blog.tags.through.objects.bulk_create([
+                    Blog.tags.through(blog_id=blog.pk, tag_id=tag)
+                    for blog in blogs
+                    for tag in self.random.sample(tags, min(len(tags), self.random.randint(1, 5)))
+                ])
+                search.index_blogs([blog.pk for blog in blogs])
+            done += len(blogs)
+            self.progress('blogs', done, count)
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+from blogs.search import SEARCH_TABLE
+from blogs.utils import html_to_text
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"title, subtitle, content, tags, page, categories, "
+        f"tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def populate_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Blog = apps.get_model('blogs', 'Blog')
+    blogs = Blog.objects.select_related('page').prefetch_related('tags', 'page__category')
+    insert = (
+        f'INSERT INTO {SEARCH_TABLE} (rowid, title, subtitle, content, tags, page, categories) '
+        f'VALUES (%s, %s, %s, %s, %s, %s, %s)'
+    )
+    rows = []
+    with schema_editor.connection.cursor() as cursor:
+        for blog in blogs.iterator(chunk_size=500):
+            rows.append((
+                blog.pk,
+                blog.title,
+                blog.subtitle,
+                html_to_text(blog.content),
+                ' '.join(tag.title for tag in blog.tags.all()),
+                blog.page.title,
+                ' '.join(category.title for category in blog.page.category.all()),
+            ))
+            if len(rows) == 500:
+                cursor.executemany(insert, rows)
+                rows = []
+        cursor.executemany(insert, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
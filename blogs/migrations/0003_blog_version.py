@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0002_blog_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_rows(rows, fk):
+    counts = rows.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counts), 0)
+
+
+def populate_counters(apps, schema_editor):
+    Blog = apps.get_model('blogs', 'Blog')
+    Page = apps.get_model('blogs', 'Page')
+    Tag = apps.get_model('blogs', 'Tag')
+    Category = apps.get_model('blogs', 'Category')
+    Tag.objects.update(blog_count=count_rows(Blog.tags.through, 'tag'))
+    Page.objects.update(blog_count=count_rows(Blog, 'page'))
+    Category.objects.update(page_count=count_rows(Page.category.through, 'category'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0004_blog_reading_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='page_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='blog_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='blog_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
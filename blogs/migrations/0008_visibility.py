@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+def publish_existing_blogs(apps, schema_editor):
+    # Nothing in the site ever set is_published, yet every blog was listed; keep them visible
+    # now that the public feed filters on the flag.
+    Blog = apps.get_model('blogs', 'Blog')
+    Blog.objects.filter(is_published=False).update(is_published=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0007_view_indexes'),
+    ]
+
+    operations = [
+        # Django keeps defaults out of the schema, so this is state-only (and avoids SQLite
+        # rebuilding blogs_blog).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='blog',
+                    name='is_published',
+                    field=models.BooleanField(default=True),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(condition=models.Q(('is_private', False)), fields=['title'], name='page_public_title_idx'),
+        ),
+        migrations.RunPython(publish_existing_blogs, migrations.RunPython.noop),
+    ]
@@ -1,50 +1,179 @@
-from datetime import datetime
+from math import ceil
 
 from ckeditor.fields import RichTextField
 from django.contrib.auth.models import User
 from django.db import models
-from django.template.defaultfilters import slugify
+from django.db.models import Exists, F, OuterRef, Prefetch, Q
+from django.db.models.functions import Greatest
+from django.utils.text import Truncator
 
+from blogs.slugs import allocate_slug, save_with_unique_slug
+from blogs.utils import html_to_text
 
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
 
-class Category(models.Model):
+
+class CounterQuerySet(models.QuerySet):
+    def shift(self, field, delta):
+        # Atomic in-database adjustment that never goes below zero; drift is left to reconcile_counters.
+        if not delta:
+            return 0
+        return self.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+class VersionedQuerySet(models.QuerySet):
+    def bump_version(self):
+        return self.update(version=F('version') + 1)
+
+
+class PageQuerySet(CounterQuerySet, VersionedQuerySet):
+    def public(self):
+        return self.filter(is_private=False)
+
+    def visible_to(self, user):
+        # Public pages plus the user's own private ones.
+        if not user.is_authenticated:
+            return self.public()
+        return self.filter(Q(is_private=False) | Q(creator=user))
+
+
+class TagQuerySet(CounterQuerySet):
+    def public(self):
+        # Tags on at least one public blog.
+        return self.filter(Exists(Blog.objects.public().filter(tags=OuterRef('pk'))))
+
+    def visible_to(self, user):
+        # Tags on a blog the user can see, plus unused ones, which reveal nothing.
+        return self.filter(
+            Exists(Blog.objects.visible_to(user).filter(tags=OuterRef('pk')))
+            | ~Exists(Blog.tags.through.objects.filter(tag=OuterRef('pk')))
+        )
+
+
+class CategoryQuerySet(CounterQuerySet):
+    def public(self):
+        # Categories of at least one public page.
+        return self.filter(Exists(Page.objects.public().filter(category=OuterRef('pk'))))
+
+    def visible_to(self, user):
+        # Categories of a page the user can see, plus unused ones.
+        return self.filter(
+            Exists(Page.objects.visible_to(user).filter(category=OuterRef('pk')))
+            | ~Exists(Page.category.through.objects.filter(category=OuterRef('pk')))
+        )
+
+
+class SluggedModel(models.Model):
+    # Keeps ``slug`` unique and derived from ``title``; it is only reallocated when the title changes.
+    # Columns in ``counter_fields`` are maintained with UPDATE ... SET n = n + 1 and are left out of
+    # ordinary saves, so editing a row never writes back a stale count.
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_title = instance.__dict__.get('title')
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded_title = getattr(self, '_loaded_title', None)
+        if not self.slug or (loaded_title is not None and loaded_title != self.title):
+            self.slug = allocate_slug(type(self), self.title, exclude_pk=self.pk)
+        if self.counter_fields and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        save_with_unique_slug(self, super().save, *args, **kwargs)
+        self._loaded_title = self.title
+
+
+class Category(SluggedModel):
     title = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, db_index=True, blank=True)
+    page_count = models.PositiveIntegerField(default=0, editable=False)
 
-    def save(self, *args, **kwargs):
-        self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+    counter_fields = ('page_count',)
+    objects = CategoryQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
-class Page(models.Model):
+class Page(SluggedModel):
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, db_index=True, blank=True)
     category = models.ManyToManyField(Category)
     image = models.ImageField(upload_to='Page/img/', blank=True, null=True)
     is_private = models.BooleanField(default=False)
+    blog_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped whenever anything shown in the page box changes; part of the conditional-GET ETags.
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    counter_fields = ('blog_count',)
+    objects = PageQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # my_pages_view: WHERE creator_id = ? ORDER BY title.
+            models.Index(fields=['creator', 'title'], name='page_creator_title_idx'),
+            # page_view and write_view for anonymous visitors: public pages by title.
+            models.Index(fields=['title'], name='page_public_title_idx', condition=models.Q(is_private=False)),
+        ]
 
     def save(self, *args, **kwargs):
-        self.slug = slugify(self.title)
+        if self.pk:
+            self.version = F('version') + 1
         super().save(*args, **kwargs)
+        if not isinstance(self.version, int):
+            self.refresh_from_db(fields=['version'])
 
     def __str__(self):
         return self.title
 
-class Tag(models.Model):
+class Tag(SluggedModel):
     title = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, db_index=True, blank=True)
+    blog_count = models.PositiveIntegerField(default=0, editable=False)
 
-    def save(self, *args, **kwargs):
-        self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+    counter_fields = ('blog_count',)
+    objects = TagQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
-class Blog(models.Model):
+class BlogQuerySet(VersionedQuerySet):
+    # Columns rendered by blogs/partials/_blog.html; everything else stays deferred.
+    CARD_FIELDS = (
+        'title', 'subtitle', 'slug', 'excerpt', 'reading_time', 'created_at', 'version',
+        'page', 'page__title', 'page__slug', 'page__image',
+        'author', 'author__username',
+    )
+
+    def public(self):
+        # Matches the condition of blog_public_feed_idx, so the public feed reads only visible rows.
+        return self.filter(is_published=True, is_private=False, page__is_private=False)
+
+    def visible_to(self, user):
+        # The public feed plus everything the user wrote, unpublished and private posts included.
+        if not user.is_authenticated:
+            return self.public()
+        return self.filter(Q(is_published=True, is_private=False, page__is_private=False) | Q(author=user))
+
+    def feed(self):
+        return (
+            self.select_related('page', 'author')
+            .prefetch_related(Prefetch('tags', queryset=Tag.objects.only('title', 'slug')))
+            .only(*self.CARD_FIELDS)
+            .order_by('-created_at', 'id')
+        )
+
+
+class Blog(SluggedModel):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=50)
     subtitle = models.CharField(max_length=200)
@@ -54,21 +183,60 @@ class Blog(models.Model):
     content = RichTextField(config_name='default')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    is_published = models.BooleanField(default=False)
+    is_published = models.BooleanField(default=True)
     is_private = models.BooleanField(default=False)
+    # Bumped whenever anything shown on the blog card changes; keys the rendered card cache.
+    version = models.PositiveIntegerField(default=1, editable=False)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=1, editable=False, help_text='Minutes')
+
+    objects = BlogQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Conditional-GET probe for listings: MAX(updated_at) is a single index seek.
+            models.Index(fields=['updated_at'], name='blog_updated_at_idx'),
+            # Feed order is (-created_at, id); these match it exactly, so per-page and per-author
+            # listings (and their keyset cursors) read the index in order with no sort step.
+            models.Index(fields=['page', '-created_at', 'id'], name='blog_page_created_idx'),
+            models.Index(fields=['author', '-created_at', 'id'], name='blog_author_created_idx'),
+            # The public feed: only published, non-private rows are in the index.
+            models.Index(
+                fields=['-created_at', 'id'],
+                name='blog_public_feed_idx',
+                condition=models.Q(is_published=True, is_private=False),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the counter signals move Page.blog_count when a blog changes page.
+        instance._loaded_page_id = instance.__dict__.get('page_id')
+        return instance
+
+    def update_reading_stats(self):
+        text = html_to_text(self.content)
+        self.excerpt = Truncator(text).chars(EXCERPT_LENGTH)
+        self.word_count = len(text.split())
+        self.reading_time = max(1, ceil(self.word_count / WORDS_PER_MINUTE))
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            self.slug = slugify(self.title)
-            while Blog.objects.filter(slug=self.slug).exists():
-                self.slug = f"{slugify(self.title)}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        else:
-            existing_blog = Blog.objects.filter(pk=self.pk).first()
-            if existing_blog and existing_blog.title != self.title:
-                self.slug = slugify(self.title)
-                while Blog.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
-                    self.slug = f"{slugify(self.title)}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.update_reading_stats()
+            if update_fields is not None:
+                update_fields = {*update_fields, 'excerpt', 'word_count', 'reading_time'}
+        if self.pk:
+            self.version = F('version') + 1
+            if update_fields is not None:
+                update_fields = {*update_fields, 'version'}
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
+        if not isinstance(self.version, int):
+            self.refresh_from_db(fields=['version'])
 
     def __str__(self):
         return f"{self.title} by {self.author.username}"
@@ -0,0 +1,116 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from BlogWebSiteWithDjango.database import has_pending_messages
+from blogs.conditional import content_generation, make_etag
+
+PAGE_CACHE_PREFIX = 'blogs.page'
+STATS_PREFIX = 'blogs.page_cache.stats'
+OUTCOMES = ('hit', 'miss', 'bypass')
+# Query parameters that never change what a page renders.
+IGNORED_PARAMS = ('fbclid', 'gclid')
+
+
+def cache_key(request):
+    # Parameter order and blank filter fields do not change the page, so they share one entry.
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        if name not in IGNORED_PARAMS and not name.startswith('utm_')
+        for value in values
+        if value != ''
+    )
+    return f'{PAGE_CACHE_PREFIX}:{content_generation()}:{make_etag(request.path, params)}'
+
+
+def bypass(request):
+    return (
+        not settings.PAGE_CACHE_TIMEOUT
+        or request.method not in ('GET', 'HEAD')
+        or getattr(request, 'profiling', False)
+        or request.user.is_authenticated
+        or has_pending_messages(request)
+    )
+
+
+def cacheable(request, response):
+    # Only plain 200s that are the same for every anonymous reader: nothing that sets a
+    # cookie, and nothing that queued a flash message the next reader would otherwise see.
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not messages.get_messages(request).added_new
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def not_modified(request, response):
+    last_modified = response.get('Last-Modified')
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+        response=response,
+    )
+
+
+def cached_page(view):
+    # Whole rendered responses for anonymous GETs, per content generation, so any write to a
+    # blog, page, tag or category drops every entry at once. Signed-in users, requests carrying
+    # flash messages and profiled requests always render. X-Page-Cache says which happened.
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        started = time.perf_counter()
+        if bypass(request):
+            response = view(request, *args, **kwargs)
+            outcome = 'bypass'
+        else:
+            key = cache_key(request)
+            cached = cache.get(key)
+            if cached is not None:
+                response = not_modified(request, cached)
+                outcome = 'hit'
+            else:
+                response = view(request, *args, **kwargs)
+                if cacheable(request, response):
+                    cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+                outcome = 'miss'
+        record(outcome, time.perf_counter() - started)
+        response['X-Page-Cache'] = outcome
+        return response
+
+    return wrapper
+
+
+def record(outcome, seconds):
+    # Shared counters, so the hit ratio covers every worker; incr is atomic on memcached and
+    # Redis and close enough on the local backends.
+    for name, amount in ((f'{outcome}.count', 1), (f'{outcome}.us', round(seconds * 1e6))):
+        key = f'{STATS_PREFIX}.{name}'
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            cache.set(key, amount, None)
+
+
+def stats():
+    values = cache.get_many([f'{STATS_PREFIX}.{outcome}.{name}' for outcome in OUTCOMES for name in ('count', 'us')])
+    result = {}
+    for outcome in OUTCOMES:
+        count = values.get(f'{STATS_PREFIX}.{outcome}.count', 0)
+        micros = values.get(f'{STATS_PREFIX}.{outcome}.us', 0)
+        result[outcome] = {'count': count, 'avg_ms': round(micros / count / 1000, 2) if count else None}
+    lookups = result['hit']['count'] + result['miss']['count']
+    result['hit_ratio'] = round(result['hit']['count'] / lookups, 3) if lookups else None
+    return result
+
+
+def reset_stats():
+    cache.delete_many([f'{STATS_PREFIX}.{outcome}.{name}' for outcome in OUTCOMES for name in ('count', 'us')])
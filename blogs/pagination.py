@@ -0,0 +1,279 @@
+from datetime import datetime
+
+from django.contrib import messages
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'blogs.pagination.cursor'
+COUNT_CACHE_PREFIX = 'blogs.pagination.count'
+# Unfiltered tables estimated above this size are not counted exactly.
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_count(model, using='default'):
+    # Planner statistics on PostgreSQL; on SQLite MAX(rowid) is a single index seek and an
+    # upper bound on the row count. None when the backend offers no cheap estimate.
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CountedPage(Page):
+    has_more = None
+    # Page links shown on each side of the current one.
+    window = 2
+
+    def has_next(self):
+        if self.has_more is not None:
+            return self.has_more
+        return super().has_next()
+
+    @property
+    def page_window(self):
+        # The numbered links around this page. Looping over page_range in the template instead
+        # walks every page, thousands of them for a broad search. Past a capped count, the
+        # window ends at this page, or at the next one when it has results.
+        last = max(self.paginator.num_pages, self.number + self.has_next())
+        return range(max(1, self.number - self.window), min(last, self.number + self.window) + 1)
+
+
+class CountedPaginator(Paginator):
+    # Counts at most once per request: a short first page is its own count, unfiltered
+    # querysets can reuse a cached count, and count_limit caps the scan (shown as "1000+").
+    # A filtered queryset shares a cached count only under a caller-chosen count_cache_key that
+    # names its condition, e.g. 'public' for what every anonymous visitor sees.
+
+    def __init__(self, object_list, per_page, count_limit=None, count_cache_timeout=None, count_cache_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_limit = count_limit
+        self.count_cache_timeout = count_cache_timeout
+        self.count_cache_key = count_cache_key
+
+    def _count_cache_key(self):
+        query = getattr(self.object_list, 'query', None)
+        if not self.count_cache_timeout or query is None:
+            return None
+        if self.count_cache_key is None and (query.where or query.distinct):
+            return None
+        scope = self.count_cache_key or 'all'
+        return f'{COUNT_CACHE_PREFIX}:{self.object_list.model._meta.label_lower}:{scope}:{self.count_limit}'
+
+    def _count(self):
+        if self.count_limit is None:
+            return super().count
+        if hasattr(self.object_list, 'query'):
+            # Unordered: the order never changes how many of the first limit + 1 rows exist, and
+            # sorting them first (a search's bm25 rank, say) would cost more than the count.
+            return self.object_list.order_by()[:self.count_limit + 1].count()
+        return min(len(self.object_list), self.count_limit + 1)
+
+    @cached_property
+    def count(self):
+        key = self._count_cache_key()
+        if key is None:
+            return self._count()
+        count = cache.get(key)
+        if count is None:
+            count = self._count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    @property
+    def count_capped(self):
+        return self.count_limit is not None and self.count > self.count_limit
+
+    @property
+    def display_count(self):
+        return f'{self.count_limit}+' if self.count_capped else str(self.count)
+
+    def validate_number(self, number):
+        if not self.count_capped:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_capped:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+
+    def get_page(self, number):
+        if number in (None, '', 1, '1'):
+            rows = list(self.object_list[:self.per_page + 1])
+            if len(rows) <= self.per_page:
+                self.__dict__['count'] = len(rows)
+            page = self._get_page(rows[:self.per_page], 1, self)
+            if self.count_limit is not None:
+                page.has_more = len(rows) > self.per_page
+            return page
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # A capped count cannot rule out a page past the end up front; fall back to the last
+            # page the count does cover, as the uncapped paginator does.
+            return self.page(self.num_pages)
+
+    def _get_page(self, *args, **kwargs):
+        return CountedPage(*args, **kwargs)
+
+    def page_for_request(self, request):
+        return self.get_page(request.GET.get('page'))
+
+
+class EstimatedCountPaginator(Paginator):
+    # For admin changelists: an unfiltered list of a large table uses the estimate instead of
+    # COUNT(*); filtered lists and small tables are counted exactly.
+    estimate_threshold = ESTIMATE_THRESHOLD
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and not query.distinct and not query.combinator:
+            estimate = estimated_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate > self.estimate_threshold:
+                return estimate
+        return super().count
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    # Seeks on (-created_at, id) instead of OFFSET, so every page costs the same as the first.
+    is_keyset = True
+    ordering = ('-created_at', 'id')
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def encode_cursor(self, obj, direction):
+        return signing.dumps([obj.created_at.isoformat(), obj.pk, direction], salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, pk, direction = signing.loads(cursor, salt=CURSOR_SALT)
+            return datetime.fromisoformat(created_at), int(pk), direction
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+
+    def _after(self, created_at, pk):
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__gt=pk)
+
+    def _before(self, created_at, pk):
+        return Q(created_at__gt=created_at) | Q(created_at=created_at, pk__lt=pk)
+
+    def _forward(self, condition=None, has_previous=False):
+        queryset = self.object_list.order_by(*self.ordering)
+        if condition is not None:
+            queryset = queryset.filter(condition)
+        rows = list(queryset[:self.per_page + 1])
+        objects = rows[:self.per_page]
+        return KeysetPage(
+            objects,
+            self,
+            next_cursor=self.encode_cursor(objects[-1], 'next') if len(rows) > self.per_page else None,
+            previous_cursor=self.encode_cursor(objects[0], 'prev') if has_previous and objects else None,
+        )
+
+    def _backward(self, condition):
+        queryset = self.object_list.order_by('created_at', '-id').filter(condition)
+        rows = list(queryset[:self.per_page + 1])
+        if not rows:
+            return self._forward()
+        objects = rows[:self.per_page][::-1]
+        return KeysetPage(
+            objects,
+            self,
+            next_cursor=self.encode_cursor(objects[-1], 'next'),
+            previous_cursor=self.encode_cursor(objects[0], 'prev') if len(rows) > self.per_page else None,
+        )
+
+    def _legacy_page(self, number):
+        # Old ?page=N links: locate the row just before page N with a narrow (created_at, id)
+        # scan, then continue as a keyset page. Links rendered from here on are cursors.
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number <= 1:
+            return self._forward()
+        offset = (number - 1) * self.per_page - 1
+        boundary = (
+            self.object_list.order_by(*self.ordering).values_list('created_at', 'pk')[offset:offset + 1]
+        )
+        boundary = list(boundary)
+        if not boundary:
+            return self._forward()
+        return self._forward(self._after(*boundary[0]), has_previous=True)
+
+    def page_for_request(self, request):
+        return self.get_page(request.GET.get('cursor'), request.GET.get('page'))
+
+    def get_page(self, cursor=None, number=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self._legacy_page(number)
+        created_at, pk, direction = decoded
+        if direction == 'prev':
+            return self._backward(self._before(created_at, pk))
+        return self._forward(self._after(created_at, pk), has_previous=True)
+
+
+def paginate(request, paginator, empty_message=None):
+    page_obj = paginator.page_for_request(request)
+    if empty_message and not page_obj.object_list:
+        messages.warning(request, empty_message)
+    return page_obj
@@ -0,0 +1,127 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from blogs.utils import html_to_text
+
+SEARCH_TABLE = 'blogs_blog_search'
+# bm25 column weights, in the order the columns are declared in the migration.
+RANK_WEIGHTS = (10.0, 5.0, 1.0, 4.0, 3.0, 2.0)
+INDEX_CHUNK_SIZE = 500
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match(query):
+    # Every term must match, each as a quoted prefix so user input can't inject FTS syntax.
+    terms = TOKEN_RE.findall(query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _chunks(ids, size=INDEX_CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _document(blog):
+    return (
+        blog.pk,
+        blog.title,
+        blog.subtitle,
+        html_to_text(blog.content),
+        ' '.join(tag.title for tag in blog.tags.all()),
+        blog.page.title,
+        ' '.join(category.title for category in blog.page.category.all()),
+    )
+
+
+def index_blogs(blog_ids):
+    if not is_available():
+        return
+    from blogs.models import Blog
+
+    for chunk in _chunks(blog_ids):
+        blogs = (
+            Blog.objects.filter(pk__in=chunk)
+            .select_related('page')
+            .prefetch_related('tags', 'page__category')
+            .only('title', 'subtitle', 'content', 'page__title')
+        )
+        rows = [_document(blog) for blog in blogs]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(chunk))})', chunk
+            )
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, title, subtitle, content, tags, page, categories) '
+                f'VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                rows,
+            )
+
+
+def remove_blogs(blog_ids):
+    if not is_available():
+        return
+    for chunk in _chunks(blog_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(chunk))})', chunk
+            )
+
+
+def rebuild_index(chunk_size=INDEX_CHUNK_SIZE):
+    from blogs.models import Blog
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    last_id = 0
+    indexed = 0
+    while True:
+        ids = list(
+            Blog.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return indexed
+        index_blogs(ids)
+        indexed += len(ids)
+        last_id = ids[-1]
+
+
+def match_condition(query):
+    # Q for "pk is in the FTS matches", usable inside any Blog queryset (the admin changelist).
+    match = build_match(query)
+    if not match:
+        return Q(pk__in=[])
+    return Q(pk__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [match]))
+
+
+def search_blogs(query, queryset):
+    # Matching, ranking and slicing all happen in ``queryset``'s own SQL, so its filters
+    # (visibility above all) apply before LIMIT/OFFSET and to the count.
+    if is_available():
+        match = build_match(query)
+        if not match:
+            return queryset.none()
+        # A join rather than a rank subquery: FTS5 runs the MATCH once, not once per row.
+        weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+        return queryset.extra(
+            select={'search_rank': f'bm25({SEARCH_TABLE}, {weights})'},
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE}.rowid = {queryset.model._meta.db_table}.id', f'{SEARCH_TABLE} MATCH %s'],
+            params=[match],
+        ).order_by('search_rank', '-created_at', '-id')
+    return queryset.filter(
+        Q(title__icontains=query) |
+        Q(subtitle__icontains=query) |
+        Q(content__icontains=query) |
+        Q(tags__title__icontains=query) |
+        Q(page__title__icontains=query) |
+        Q(page__category__title__icontains=query)
+    ).distinct()
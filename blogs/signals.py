@@ -0,0 +1,250 @@
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Profile
+from blogs import search, thumbnails
+from blogs.conditional import bump_content_generation
+from blogs.models import Blog, Category, Page, Tag
+
+
+def _blog_ids(**filters):
+    return list(Blog.objects.filter(**filters).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Blog)
+def index_saved_blog(sender, instance, **kwargs):
+    search.index_blogs([instance.pk])
+
+
+@receiver(post_delete, sender=Blog)
+def unindex_deleted_blog(sender, instance, **kwargs):
+    search.remove_blogs([instance.pk])
+
+
+@receiver(m2m_changed, sender=Blog.tags.through)
+def reindex_blog_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._search_blog_ids = _blog_ids(tags=instance)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.index_blogs([instance.pk])
+    elif action == 'post_clear':
+        search.index_blogs(getattr(instance, '_search_blog_ids', []))
+    else:
+        search.index_blogs(pk_set)
+
+
+@receiver(m2m_changed, sender=Page.category.through)
+def reindex_page_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._search_blog_ids = _blog_ids(page__category=instance)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.index_blogs(_blog_ids(page=instance))
+    elif action == 'post_clear':
+        search.index_blogs(getattr(instance, '_search_blog_ids', []))
+    else:
+        search.index_blogs(_blog_ids(page__in=pk_set))
+
+
+@receiver(post_save, sender=Page)
+def reindex_page_blogs(sender, instance, created, **kwargs):
+    if not created:
+        search.index_blogs(_blog_ids(page=instance))
+
+
+@receiver(post_save, sender=Tag)
+def reindex_tag_blogs(sender, instance, created, **kwargs):
+    if not created:
+        search.index_blogs(_blog_ids(tags=instance))
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_blogs(sender, instance, created, **kwargs):
+    if not created:
+        search.index_blogs(_blog_ids(page__category=instance))
+
+
+@receiver(pre_delete, sender=Tag)
+def collect_tag_blogs(sender, instance, **kwargs):
+    instance._search_blog_ids = _blog_ids(tags=instance)
+
+
+@receiver(pre_delete, sender=Category)
+def collect_category_blogs(sender, instance, **kwargs):
+    instance._search_blog_ids = _blog_ids(page__category=instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def reindex_after_delete(sender, instance, **kwargs):
+    search.index_blogs(getattr(instance, '_search_blog_ids', []))
+
+
+# Card versions: anything rendered on a blog card bumps Blog.version so the cached card is rebuilt.
+
+@receiver(m2m_changed, sender=Blog.tags.through)
+def bump_tagged_blog_versions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._card_blog_ids = _blog_ids(tags=instance)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        Blog.objects.filter(pk=instance.pk).bump_version()
+    elif action == 'post_clear':
+        Blog.objects.filter(pk__in=getattr(instance, '_card_blog_ids', [])).bump_version()
+    else:
+        Blog.objects.filter(pk__in=pk_set).bump_version()
+
+
+@receiver(post_save, sender=Tag)
+def bump_versions_for_tag(sender, instance, created, **kwargs):
+    if not created:
+        Blog.objects.filter(tags=instance).bump_version()
+
+
+@receiver(pre_delete, sender=Tag)
+def bump_versions_for_deleted_tag(sender, instance, **kwargs):
+    Blog.objects.filter(tags=instance).bump_version()
+
+
+@receiver(pre_save, sender=Page)
+def bump_versions_for_page(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    previous = Page.objects.filter(pk=instance.pk).values('title', 'slug', 'image').first()
+    current = {'title': instance.title, 'slug': instance.slug, 'image': instance.image.name or ''}
+    if previous and {key: value or '' for key, value in previous.items()} != current:
+        Blog.objects.filter(page=instance).bump_version()
+
+
+@receiver(pre_save, sender=User)
+def bump_versions_for_author(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and 'username' not in update_fields):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+    if previous is not None and previous != instance.username:
+        Blog.objects.filter(author=instance).bump_version()
+        Page.objects.filter(creator=instance).bump_version()
+        bump_content_generation()
+
+
+# Page versions: the page box shows the page's categories, so those changes bump Page.version.
+
+@receiver(m2m_changed, sender=Page.category.through)
+def bump_categorised_page_versions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._version_page_ids = list(Page.objects.filter(category=instance).values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        Page.objects.filter(pk=instance.pk).bump_version()
+    elif action == 'post_clear':
+        Page.objects.filter(pk__in=getattr(instance, '_version_page_ids', [])).bump_version()
+    else:
+        Page.objects.filter(pk__in=pk_set).bump_version()
+
+
+@receiver(post_save, sender=Category)
+def bump_versions_for_category(sender, instance, created, **kwargs):
+    if not created:
+        Page.objects.filter(category=instance).bump_version()
+
+
+@receiver(pre_delete, sender=Category)
+def bump_versions_for_deleted_category(sender, instance, **kwargs):
+    Page.objects.filter(category=instance).bump_version()
+
+
+# Content generation: any write that can change a rendered page invalidates listing ETags.
+
+def bump_generation(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_content_generation()
+
+
+for model in (Blog, Page, Tag, Category, Profile):
+    post_save.connect(bump_generation, sender=model, dispatch_uid=f'generation.save:{model._meta.label}')
+    post_delete.connect(bump_generation, sender=model, dispatch_uid=f'generation.delete:{model._meta.label}')
+for through in (Blog.tags.through, Page.category.through):
+    m2m_changed.connect(bump_generation, sender=through, dispatch_uid=f'generation.m2m:{through._meta.label}')
+
+
+# Counters: Tag.blog_count, Page.blog_count and Category.page_count follow every change
+# with relative UPDATEs, so concurrent writers never overwrite each other's increments.
+
+@receiver(post_save, sender=Blog)
+def count_saved_blog(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_page_id', None)
+    if created:
+        Page.objects.filter(pk=instance.page_id).shift('blog_count', 1)
+    elif previous is not None and previous != instance.page_id:
+        Page.objects.filter(pk=previous).shift('blog_count', -1)
+        Page.objects.filter(pk=instance.page_id).shift('blog_count', 1)
+    instance._loaded_page_id = instance.page_id
+
+
+@receiver(pre_delete, sender=Blog)
+def collect_deleted_blog_tags(sender, instance, **kwargs):
+    instance._counter_tag_ids = list(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Blog)
+def count_deleted_blog(sender, instance, **kwargs):
+    Page.objects.filter(pk=instance.page_id).shift('blog_count', -1)
+    Tag.objects.filter(pk__in=getattr(instance, '_counter_tag_ids', [])).shift('blog_count', -1)
+
+
+@receiver(pre_delete, sender=Page)
+def count_deleted_page(sender, instance, **kwargs):
+    # The page's category links are removed without m2m_changed, so adjust the counts here.
+    Category.objects.filter(page=instance).shift('page_count', -1)
+
+
+def _count_m2m(counted, field, links, target, instance, action, reverse, pk_set):
+    # ``counted`` holds the counter and is the target side of the relation; ``links`` are the
+    # instance's through rows and ``target`` their column pointing at ``counted``.
+    if action == 'pre_clear':
+        instance._counter_cleared = links.count() if reverse else list(links.values_list(target, flat=True))
+    elif action in ('post_add', 'post_remove'):
+        delta = 1 if action == 'post_add' else -1
+        if reverse:
+            counted.objects.filter(pk=instance.pk).shift(field, delta * len(pk_set))
+        else:
+            counted.objects.filter(pk__in=pk_set).shift(field, delta)
+    elif action == 'post_clear':
+        cleared = getattr(instance, '_counter_cleared', None)
+        if reverse:
+            counted.objects.filter(pk=instance.pk).shift(field, -(cleared or 0))
+        else:
+            counted.objects.filter(pk__in=cleared or []).shift(field, -1)
+
+
+@receiver(m2m_changed, sender=Blog.tags.through)
+def count_blog_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    links = sender.objects.filter(**{'tag' if reverse else 'blog': instance})
+    _count_m2m(Tag, 'blog_count', links, 'tag_id', instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Page.category.through)
+def count_page_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    links = sender.objects.filter(**{'category' if reverse else 'page': instance})
+    _count_m2m(Category, 'page_count', links, 'category_id', instance, action, reverse, pk_set)
+
+
+# Thumbnails: stored file names are unique, so a name without its thumbnails is a new upload.
+
+def create_thumbnails(sender, instance, **kwargs):
+    fieldfile = getattr(instance, sender._thumbnail_field)
+    if fieldfile and not thumbnails.has_thumbnails(fieldfile):
+        thumbnails.generate_thumbnails(fieldfile)
+
+
+for label, field in thumbnails.THUMBNAIL_FIELDS:
+    model = apps.get_model(label)
+    model._thumbnail_field = field
+    post_save.connect(create_thumbnails, sender=model, dispatch_uid=f'thumbnails:{label}')
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+from django.urls import reverse
+
+from blogs.conditional import content_generation
+from blogs.models import Blog, Category, Page, Tag
+
+# URLs per shard; shard N of a section covers primary keys (N * SHARD_SIZE, (N + 1) * SHARD_SIZE].
+SHARD_SIZE = 10000
+CHUNK_SIZE = 1000
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+SITEMAP_CACHE_PREFIX = 'blogs.sitemap'
+SITEMAP_CACHE_TIMEOUT = 60 * 60
+
+
+class SitemapSection:
+    # One kind of URL. Rows are read in keyset chunks over the primary key, and each shard has a
+    # cheap fingerprint of everything its XML depends on, so it is rewritten only when that changes.
+    name = None
+    model = None
+
+    def queryset(self):
+        return self.model.objects.all()
+
+    def shard_count(self):
+        last = self.model.objects.aggregate(last=Max('pk'))['last']
+        return 0 if last is None else (last - 1) // SHARD_SIZE + 1
+
+    def shard_queryset(self, number):
+        return self.queryset().filter(pk__gt=number * SHARD_SIZE, pk__lte=(number + 1) * SHARD_SIZE)
+
+    def fingerprint(self, rows):
+        raise NotImplementedError
+
+    def entries(self, rows):
+        # (primary key, location, lastmod) in primary key order.
+        raise NotImplementedError
+
+    def iter_entries(self, number):
+        rows = self.shard_queryset(number).order_by('pk')
+        last = 0
+        while True:
+            chunk = list(self.entries(rows.filter(pk__gt=last)[:CHUNK_SIZE]))
+            if not chunk:
+                return
+            yield from chunk
+            last = chunk[-1][0]
+
+
+def _latest(queryset):
+    return queryset.aggregate(latest=Max('updated_at'))['latest']
+
+
+def _public_lastmod(blog):
+    # Max(updated_at) over the public blogs reached through ``blog``, the same rows as
+    # Blog.objects.public(), so private edits neither show up in nor move a <lastmod>.
+    return Max(f'{blog}__updated_at', filter=Q(**{
+        f'{blog}__is_published': True, f'{blog}__is_private': False, f'{blog}__page__is_private': False,
+    }))
+
+
+class BlogSection(SitemapSection):
+    name = 'blogs'
+    model = Blog
+
+    def queryset(self):
+        return Blog.objects.public()
+
+    def fingerprint(self, rows):
+        # version is bumped by any change to the blog's own slug or its page's slug.
+        return rows.aggregate(n=Count('pk'), versions=Sum('version'), latest=Max('updated_at'))
+
+    def entries(self, rows):
+        for pk, slug, page_slug, updated_at in rows.values_list('pk', 'slug', 'page__slug', 'updated_at'):
+            yield pk, reverse('blog_detail', args=[page_slug, slug]), updated_at
+
+
+class PageSection(SitemapSection):
+    name = 'pages'
+    model = Page
+
+    def queryset(self):
+        return Page.objects.public()
+
+    def fingerprint(self, rows):
+        state = rows.aggregate(n=Count('pk'), versions=Sum('version'), blogs=Sum('blog_count'))
+        state['latest'] = _latest(Blog.objects.public().filter(page__in=rows))
+        return state
+
+    def entries(self, rows):
+        for pk, slug, lastmod in rows.annotate(lastmod=_public_lastmod('blog')).values_list('pk', 'slug', 'lastmod'):
+            yield pk, reverse('page_detail', args=[slug]), lastmod
+
+
+class TagSection(SitemapSection):
+    name = 'tags'
+    model = Tag
+
+    def queryset(self):
+        # Only tags with a public post; tag_view redirects anonymous readers away from the rest.
+        return Tag.objects.public()
+
+    def fingerprint(self, rows):
+        # Tags carry no version, so the (pk, slug) list itself is hashed; it is small.
+        slugs = hashlib.md5(json.dumps(list(rows.order_by('pk').values_list('pk', 'slug'))).encode()).hexdigest()
+        return {'slugs': slugs, 'latest': _latest(Blog.objects.public().filter(tags__in=rows))}
+
+    def entries(self, rows):
+        for pk, slug, lastmod in rows.annotate(lastmod=_public_lastmod('blog')).values_list('pk', 'slug', 'lastmod'):
+            yield pk, reverse('tags', args=[slug]), lastmod
+
+
+class CategorySection(SitemapSection):
+    name = 'categories'
+    model = Category
+
+    def queryset(self):
+        return Category.objects.public()
+
+    def fingerprint(self, rows):
+        slugs = hashlib.md5(json.dumps(list(rows.order_by('pk').values_list('pk', 'slug'))).encode()).hexdigest()
+        return {'slugs': slugs, 'latest': _latest(Blog.objects.public().filter(page__category__in=rows))}
+
+    def entries(self, rows):
+        annotated = rows.annotate(lastmod=_public_lastmod('page__blog'))
+        for pk, slug, lastmod in annotated.values_list('pk', 'slug', 'lastmod'):
+            yield pk, reverse('category', args=[slug]), lastmod
+
+
+SECTIONS = {section.name: section for section in (BlogSection(), PageSection(), TagSection(), CategorySection())}
+
+
+def sitemap_root():
+    return settings.SITEMAP_ROOT
+
+
+def _site_dir(base_url):
+    # One directory per base URL: <loc>s are absolute, so http/https or www/bare-host requests
+    # each need their own files rather than overwriting one another's.
+    return os.path.join(sitemap_root(), hashlib.md5(base_url.encode()).hexdigest()[:12])
+
+
+def shard_path(section, number, base_url):
+    return os.path.join(_site_dir(base_url), f'{section}-{number}.xml')
+
+
+def _meta_path(section, number, base_url):
+    return os.path.join(_site_dir(base_url), f'{section}-{number}.json')
+
+
+def _lastmod(value):
+    return value.isoformat(timespec='seconds') if value else None
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.tmp'
+    with open(partial, 'w', encoding='utf-8') as target:
+        write(target)
+    os.replace(partial, path)
+
+
+def ensure_shard(section_name, number, base_url):
+    # Returns the shard's metadata (fingerprint, url count, newest lastmod), regenerating the
+    # XML on disk only when the fingerprint of its primary key range has changed.
+    section = SECTIONS[section_name]
+    state = section.fingerprint(section.shard_queryset(number))
+    state = {key: _lastmod(value) if hasattr(value, 'isoformat') else value for key, value in state.items()}
+    fingerprint = hashlib.md5(json.dumps([base_url, state], sort_keys=True).encode()).hexdigest()
+    meta_path = _meta_path(section_name, number, base_url)
+    try:
+        with open(meta_path, encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+        if meta['fingerprint'] == fingerprint and os.path.exists(shard_path(section_name, number, base_url)):
+            return meta
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    stats = {'urls': 0, 'lastmod': None}
+
+    def write(target):
+        target.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n')
+        for _, location, lastmod in section.iter_entries(number):
+            target.write(f'<url><loc>{escape(base_url + location)}</loc>')
+            if lastmod:
+                target.write(f'<lastmod>{_lastmod(lastmod)}</lastmod>')
+                stats['lastmod'] = max(stats['lastmod'] or lastmod, lastmod)
+            target.write('</url>\n')
+            stats['urls'] += 1
+        target.write('</urlset>\n')
+
+    _write_atomic(shard_path(section_name, number, base_url), write)
+    meta = {'fingerprint': fingerprint, 'urls': stats['urls'], 'lastmod': _lastmod(stats['lastmod'])}
+    _write_atomic(meta_path, lambda target: json.dump(meta, target))
+    return meta
+
+
+def ensure_all(base_url):
+    # [(section, shard number, metadata)] for every non-empty shard.
+    shards = []
+    for name, section in SECTIONS.items():
+        for number in range(section.shard_count()):
+            meta = ensure_shard(name, number, base_url)
+            if meta['urls']:
+                shards.append((name, number, meta))
+    return shards
+
+
+def render_index(shards, base_url):
+    lines = [f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">']
+    for name, number, meta in shards:
+        location = escape(base_url + reverse('sitemap_shard', args=[name, number]))
+        lastmod = f'<lastmod>{meta["lastmod"]}</lastmod>' if meta['lastmod'] else ''
+        lines.append(f'<sitemap><loc>{location}</loc>{lastmod}</sitemap>')
+    lines.append('</sitemapindex>\n')
+    return '\n'.join(lines)
+
+
+def cached_shards(base_url):
+    # The shard list for the current content generation; while nothing has changed, the index
+    # and the shards are served without touching the database.
+    key = f'{SITEMAP_CACHE_PREFIX}:{content_generation()}:{base_url}'
+    shards = cache.get(key)
+    if shards is None:
+        shards = ensure_all(base_url)
+        cache.set(key, shards, SITEMAP_CACHE_TIMEOUT)
+    return shards
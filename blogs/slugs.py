@@ -0,0 +1,81 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.template.defaultfilters import slugify
+
+# Room kept at the end of the slug for a "-N" suffix.
+SUFFIX_RESERVE = 7
+MAX_ATTEMPTS = 5
+BULK_QUERY_CHUNK = 200
+
+
+def _max_length(model):
+    return model._meta.get_field('slug').max_length
+
+
+def slug_base(model, title):
+    return slugify(title)[:_max_length(model)].strip('-') or model._meta.model_name
+
+
+def _stem(model, base):
+    return base[:_max_length(model) - SUFFIX_RESERVE].strip('-')
+
+
+def _family(base, stem):
+    # "stem-" prefix as a range ('.' sorts right after '-'): SQLite won't use the slug index
+    # for LIKE ... ESCAPE, so startswith would scan the whole table.
+    return Q(slug=base) | Q(slug__gte=f'{stem}-', slug__lt=f'{stem}.')
+
+
+def _pick(base, stem, taken):
+    if base not in taken:
+        return base
+    n = 2
+    while f'{stem}-{n}' in taken:
+        n += 1
+    return f'{stem}-{n}'
+
+
+def allocate_slug(model, title, exclude_pk=None, base=None):
+    # One query fetches the whole "base" / "base-N" family; the free slug is picked in memory.
+    base = base or slug_base(model, title)
+    stem = _stem(model, base)
+    taken = model._default_manager.filter(_family(base, stem))
+    if exclude_pk is not None:
+        taken = taken.exclude(pk=exclude_pk)
+    return _pick(base, stem, set(taken.values_list('slug', flat=True)))
+
+
+def save_with_unique_slug(instance, save, *args, **kwargs):
+    # Optimistic: insert first, and only if the unique slug index rejects the row pick a new slug.
+    model = type(instance)
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            conflict = model._default_manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            if not conflict or attempt == MAX_ATTEMPTS - 1:
+                raise
+            instance.slug = allocate_slug(model, instance.title, exclude_pk=instance.pk)
+
+
+def assign_slugs(objs):
+    # Bulk variant for unsaved rows of one model: an existing ``slug`` is kept as the preferred
+    # base, otherwise the title is slugified. Slugs in use are fetched in chunks of families.
+    objs = list(objs)
+    if not objs:
+        return objs
+    model = type(objs[0])
+    wanted = [(obj, obj.slug or slug_base(model, obj.title)) for obj in objs]
+    families = {base: _stem(model, base) for _, base in wanted}
+    items = list(families.items())
+    taken = set()
+    for start in range(0, len(items), BULK_QUERY_CHUNK):
+        condition = Q()
+        for base, stem in items[start:start + BULK_QUERY_CHUNK]:
+            condition |= _family(base, stem)
+        taken.update(model._default_manager.filter(condition).values_list('slug', flat=True))
+    for obj, base in wanted:
+        obj.slug = _pick(base, families[base], taken)
+        taken.add(obj.slug)
+    return objs
@@ -0,0 +1,36 @@
+from django import template
+
+from blogs import thumbnails
+from blogs.cards import render_cards
+from monitoring.timing import span
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def query_string(context, **params):
+    # Current GET params with ``params`` applied; a value of None drops the key.
+    query = context['request'].GET.copy()
+    for key, value in params.items():
+        query.pop(key, None)
+        if value is not None:
+            query[key] = value
+    return f'?{query.urlencode()}' if query else '?'
+
+
+@register.simple_tag
+def timed(value, name):
+    # Renders ``value`` inside timing.span(name): a filter form's widgets can run queries of
+    # their own, and this puts their cost under the same Server-Timing entry as its validation.
+    with span(name):
+        return str(value)
+
+
+@register.simple_tag
+def blog_cards(blogs):
+    return render_cards(blogs)
+
+
+@register.simple_tag
+def thumbnail(fieldfile, size, default=None, **attrs):
+    return thumbnails.picture(fieldfile, size, default, **attrs)
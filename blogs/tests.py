@@ -1,3 +1,1286 @@
-from django.test import TestCase
+import gzip
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.header import header_snapshot
+from accounts.models import Profile
+from BlogWebSiteWithDjango.database import replica_reads, use_replica
+
+from blogs import benchmark, checks, pagecache, sitemaps, thumbnails
+from blogs.cards import CARD_TEMPLATE, render_cards
+from blogs.conditional import content_generation
+from blogs.counters import TAG_CLOUD_CACHE_KEY, reconcile_counters, tag_cloud
+from blogs.filters import BlogFilter, PageFilter
+from blogs.forms import BlogForm, PageForm
+from blogs.models import Blog, Category, Page, Tag
+from blogs.pagination import CountedPaginator, EstimatedCountPaginator, KeysetPaginator, estimated_count
+from blogs.search import search_blogs
+from blogs.slugs import BULK_QUERY_CHUNK, allocate_slug, assign_slugs
+
+
+class BlogFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer', password='secret-pass')
+        cls.category = Category.objects.create(title='Science')
+        cls.page = Page.objects.create(creator=cls.user, title='Physics')
+        cls.page.category.add(cls.category)
+        cls.tags = [Tag.objects.create(title=f'Tag {i}') for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def create_blogs(cls, count, page=None, author=None):
+        blogs = []
+        for i in range(count):
+            blog = Blog.objects.create(
+                author=author or cls.user,
+                page=page or cls.page,
+                title=f'Post {i}',
+                subtitle=f'Subtitle {i}',
+                content=f'<p>Body of post {i}</p>',
+            )
+            blog.tags.set(cls.tags)
+            blogs.append(blog)
+        return blogs
+
+
+class FeedQueryCountTests(BlogFixtureMixin, TestCase):
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, expected, login=False):
+        if login:
+            self.client.force_login(self.user)
+            header_snapshot(self.user)  # likewise the navbar's avatar
+        self.create_blogs(12)
+        tag_cloud()  # served from cache on every request but the first
+        one_page = self.count_queries(url)
+        self.create_blogs(12)
+        two_pages = self.count_queries(url)
+        self.assertEqual(one_page, two_pages)
+        self.assertEqual(two_pages, expected)
+
+    def test_index(self):
+        # One of these is the MAX(updated_at) conditional-GET probe.
+        self.assertConstantQueries(reverse('index'), 3)
+
+    def test_page_detail(self):
+        self.assertConstantQueries(reverse('page_detail', args=[self.page.slug]), 5)
+
+    def test_tag_view(self):
+        self.assertConstantQueries(reverse('tags', args=[self.tags[0].slug]), 4)
+
+    def test_search(self):
+        self.assertConstantQueries(reverse('searchIndex') + '?q=Post', 3)
+
+    def test_my_blogs(self):
+        self.assertConstantQueries(reverse('my-blogs'), 4, login=True)
+
+    def test_feed_loads_card_columns_only(self):
+        self.create_blogs(1)
+        blog = Blog.objects.feed().get()
+        self.assertEqual(
+            blog.get_deferred_fields(), {'content', 'updated_at', 'is_published', 'is_private', 'word_count'}
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(blog.page.slug, self.page.slug)
+            self.assertEqual(blog.author.username, 'writer')
+            self.assertEqual(len(blog.tags.all()), 3)
+
+
+class KeysetPaginationTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.blogs = self.create_blogs(7)
+        self.expected = [blog.pk for blog in sorted(self.blogs, key=lambda b: (-b.created_at.timestamp(), b.pk))]
+        self.paginator = KeysetPaginator(Blog.objects.feed(), 3)
+
+    def ids(self, page):
+        return [blog.pk for blog in page]
+
+    def test_walks_forward_and_back(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), self.expected)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertFalse(self.paginator.get_page(back.previous_cursor).has_previous())
+
+    def test_legacy_page_number(self):
+        page = self.paginator.get_page(number='2')
+        self.assertEqual(self.ids(page), self.expected[3:6])
+        self.assertTrue(page.has_previous())
+        self.assertEqual(self.ids(self.paginator.get_page(number='99')), self.expected[:3])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        self.assertEqual(self.ids(self.paginator.get_page('bogus')), self.expected[:3])
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        with self.assertNumQueries(2):
+            page = self.paginator.get_page()
+        cursor = self.paginator.get_page(page.next_cursor).next_cursor
+        with self.assertNumQueries(2):
+            self.paginator.get_page(cursor)
+
+    def test_links_keep_filter_params(self):
+        self.create_blogs(3)
+        response = self.client.get(reverse('page_detail', args=[self.page.slug]), {'tags': self.tags[0].slug})
+        self.assertContains(response, f'tags={self.tags[0].slug}&amp;cursor=')
+
+    def test_cursor_links_keep_the_page_filter(self):
+        self.create_blogs(13)
+        self.create_blogs(2, page=Page.objects.create(creator=self.user, title='Chemistry'))
+        response = self.client.get(reverse('index'), {'in_page': self.page.pk})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 12)
+        self.assertContains(response, f'in_page={self.page.pk}&amp;cursor=')
+        response = self.client.get(reverse('index'), {'in_page': self.page.pk, 'cursor': page_obj.next_cursor})
+        following = response.context['page_obj']
+        self.assertEqual(len(following), 8)
+        self.assertEqual({blog.page_id for blog in following}, {self.page.pk})
+
+
+class CountedPaginatorTests(BlogFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Page.objects.bulk_create([Page(creator=cls.user, title=f'Page {i:02}', slug=f'page-{i:02}') for i in range(24)])
+
+    def test_short_first_page_needs_no_count(self):
+        paginator = CountedPaginator(Page.objects.filter(title__startswith='Page 0').order_by('title'), 10)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(None)
+            self.assertEqual(paginator.count, 10)
+            self.assertFalse(page.has_next())
+
+    def test_full_first_page_counts_once(self):
+        paginator = CountedPaginator(Page.objects.order_by('title'), 10)
+        with self.assertNumQueries(2):
+            page = paginator.get_page('1')
+            self.assertTrue(page.has_next())
+            self.assertEqual(paginator.num_pages, 3)
+
+    def test_unfiltered_count_is_cached(self):
+        CountedPaginator(Page.objects.order_by('title'), 10, count_cache_timeout=60).count
+        paginator = CountedPaginator(Page.objects.order_by('title'), 10, count_cache_timeout=60)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 25)
+
+    def test_public_page_count_is_cached_for_anonymous_visitors(self):
+        Page.objects.create(creator=self.user, title='Diary', is_private=True)
+        self.client.get(reverse('page'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('page'), {'page': 2})
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        self.assertContains(self.client.get(reverse('page'), {'page': 3}), 'Page 23')
+        # Filters and signed-in users count for themselves.
+        self.assertIsNone(CountedPaginator(Page.objects.filter(is_private=True).order_by('title'), 10, count_cache_timeout=60)._count_cache_key())
+
+    def test_capped_count(self):
+        paginator = CountedPaginator(Page.objects.order_by('title'), 5, count_limit=10)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(paginator.display_count, '10+')
+        self.assertNotIn('ORDER BY', ctx.captured_queries[0]['sql'])
+        page = paginator.get_page('4')
+        self.assertEqual(page.number, 4)
+        self.assertTrue(page.has_next())
+        self.assertFalse(paginator.get_page('5').has_next())
+
+    def test_page_window(self):
+        paginator = CountedPaginator(Page.objects.order_by('title'), 2)
+        self.assertEqual(list(paginator.get_page('1').page_window), [1, 2, 3])
+        self.assertEqual(list(paginator.get_page('7').page_window), [5, 6, 7, 8, 9])
+        self.assertEqual(list(paginator.get_page('13').page_window), [11, 12, 13])
+        capped = CountedPaginator(Page.objects.order_by('title'), 2, count_limit=10)
+        self.assertEqual(list(capped.get_page('8').page_window), [6, 7, 8, 9])
+
+    def test_capped_count_past_the_end_falls_back_to_last_counted_page(self):
+        paginator = CountedPaginator(Page.objects.order_by('title'), 5, count_limit=10)
+        page = paginator.get_page('200')
+        self.assertEqual(page.number, paginator.num_pages)
+        self.assertTrue(page.object_list)
+        with mock.patch('blogs.views.PAGE_COUNT_LIMIT', 10):
+            response = self.client.get(reverse('page'), {'page': 200})
+        self.assertEqual(response.status_code, 200)
+
+    def test_category_view_redirects_when_empty(self):
+        response = self.client.get(reverse('category', args=[Category.objects.create(title='Empty').slug]))
+        self.assertRedirects(response, reverse('index'))
+
+
+class BlogCardCacheTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.blog = self.create_blogs(1)[0]
+
+    def render(self):
+        return render_cards(Blog.objects.feed())
+
+    def assertCardRefreshed(self, change, expected):
+        self.render()
+        change()
+        self.assertIn(expected, self.render())
+
+    def test_cards_are_served_from_cache(self):
+        self.render()
+        Blog.objects.update(title='Changed behind the cache')
+        self.assertIn('Post 0', self.render())
+        blogs = list(Blog.objects.feed())
+        with self.assertNumQueries(0), self.assertTemplateNotUsed(CARD_TEMPLATE):
+            render_cards(blogs)
+
+    def test_cached_cards_pick_up_new_static_urls(self):
+        self.assertIn('/static/img/menu.jpg', self.render())
+        with override_settings(STATIC_URL='/static/v2/'):
+            self.assertIn('/static/v2/img/menu.jpg', self.render())
+
+    def test_blog_save_invalidates(self):
+        def change():
+            self.blog.title = 'Renamed post'
+            self.blog.save()
+        self.assertCardRefreshed(change, 'Renamed post')
+
+    def test_tag_changes_invalidate(self):
+        new_tag = Tag.objects.create(title='Fresh')
+        self.assertCardRefreshed(lambda: self.blog.tags.add(new_tag), 'Fresh')
+        self.assertCardRefreshed(lambda: Tag.objects.filter(pk=new_tag.pk).get().delete(), 'Tag 0')
+        self.assertNotIn('Fresh', self.render())
+
+        def rename():
+            self.tags[0].title = 'Renamed tag'
+            self.tags[0].save()
+        self.assertCardRefreshed(rename, 'Renamed tag')
+
+    def test_page_and_author_edits_invalidate(self):
+        def rename_page():
+            self.page.title = 'Chemistry'
+            self.page.save()
+        self.assertCardRefreshed(rename_page, '/pages/chemistry/')
+
+        def rename_user():
+            self.user.username = 'novelist'
+            self.user.save()
+        self.assertCardRefreshed(rename_user, 'novelist')
+
+    def test_unrelated_saves_keep_the_card(self):
+        version = Blog.objects.get().version
+        self.page.save()
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(Blog.objects.get().version, version)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    }})
+    def test_file_based_backend(self):
+        self.assertCardRefreshed(lambda: self.blog.save(), 'Post 0')
+        self.assertEqual(self.render(), self.render())
+
+
+class ReadingStatsTests(BlogFixtureMixin, TestCase):
+    def test_stats_are_computed_on_save(self):
+        words = ' '.join(['word'] * 450)
+        blog = Blog.objects.create(author=self.user, page=self.page, title='Long', subtitle='x',
+                                   content=f'<h2>Intro &amp; more</h2><p>{words}</p>')
+        self.assertTrue(blog.excerpt.startswith('Intro & more word word'))
+        self.assertLessEqual(len(blog.excerpt), 200)
+        self.assertTrue(blog.excerpt.endswith('…'))
+        self.assertEqual(blog.word_count, 453)
+        self.assertEqual(blog.reading_time, 3)
+
+    def test_partial_save_of_content_persists_stats(self):
+        blog = self.create_blogs(1)[0]
+        version = Blog.objects.get(pk=blog.pk).version
+        blog.content = '<p>one two three four five six</p>'
+        blog.save(update_fields=['content'])
+        blog = Blog.objects.get(pk=blog.pk)
+        self.assertEqual(blog.excerpt, 'one two three four five six')
+        self.assertEqual(blog.word_count, 6)
+        self.assertEqual(blog.version, version + 1)
+
+    def test_card_renders_excerpt_not_html(self):
+        Blog.objects.create(author=self.user, page=self.page, title='Short', subtitle='x',
+                            content='<p><strong>Bold</strong> claim</p>')
+        card = render_cards(Blog.objects.feed())
+        self.assertIn('Bold claim', card)
+        self.assertNotIn('<strong>Bold', card)
+
+    def test_backfill_command(self):
+        blog = self.create_blogs(1)[0]
+        Blog.objects.update(excerpt='', word_count=0)
+        call_command('backfill_reading_stats', stdout=StringIO())
+        blog.refresh_from_db()
+        self.assertEqual(blog.excerpt, 'Body of post 0')
+        self.assertEqual(blog.word_count, 4)
+
+
+class SlugAllocationTests(BlogFixtureMixin, TestCase):
+    def new_blog(self, title='Same Title', **kwargs):
+        return Blog(author=self.user, page=self.page, title=title, subtitle='x', content='<p>x</p>', **kwargs)
+
+    def test_duplicate_titles_get_numbered_suffixes(self):
+        slugs = []
+        for _ in range(3):
+            blog = self.new_blog()
+            blog.save()
+            slugs.append(blog.slug)
+        self.assertEqual(slugs, ['same-title', 'same-title-2', 'same-title-3'])
+
+    def test_allocation_is_a_single_query(self):
+        self.new_blog().save()
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug(Blog, 'Same Title'), 'same-title-2')
+
+    def test_update_keeps_slug_until_title_changes(self):
+        blog = self.new_blog()
+        blog.save()
+        blog = Blog.objects.get(pk=blog.pk)
+        blog.subtitle = 'edited'
+        blog.save()
+        self.assertEqual(blog.slug, 'same-title')
+        blog.title = 'New Title'
+        blog.save()
+        self.assertEqual(blog.slug, 'new-title')
+
+    def test_integrity_error_retries_with_a_fresh_slug(self):
+        self.new_blog().save()
+        blog = self.new_blog(slug='same-title')
+        blog.save()
+        self.assertEqual(blog.slug, 'same-title-2')
+
+    def test_titles_that_slugify_alike(self):
+        Tag.objects.create(title='C++')
+        self.assertEqual(Tag.objects.create(title='C#').slug, 'c-2')
+
+    def test_bulk_assignment(self):
+        Tag.objects.create(title='Django')
+        tags = assign_slugs([Tag(title='django!'), Tag(title='Django?'), Tag(title='Flask'), Tag(title='x', slug='keep-me')])
+        self.assertEqual([tag.slug for tag in tags], ['django-2', 'django-3', 'flask', 'keep-me'])
+        with self.assertNumQueries(1):
+            assign_slugs([Tag(title=f'Bulk {i}') for i in range(BULK_QUERY_CHUNK)])
+
+
+class ContentImportExportTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_blogs(5)
+        self.dump = os.path.join(tempfile.mkdtemp(), 'content.jsonl')
+        call_command('export_content', self.dump, stderr=StringIO())
+
+    def snapshot(self):
+        return sorted(
+            (blog.slug, blog.title, blog.page.title, blog.created_at, tuple(sorted(t.title for t in blog.tags.all())))
+            for blog in Blog.objects.select_related('page').prefetch_related('tags')
+        )
+
+    def wipe(self):
+        Blog.objects.all().delete()
+        Page.objects.all().delete()
+        Tag.objects.all().delete()
+        Category.objects.all().delete()
+
+    def test_round_trip(self):
+        before = self.snapshot()
+        self.wipe()
+        out = StringIO()
+        call_command('import_content', self.dump, batch_size=2, stdout=out)
+        self.assertEqual(self.snapshot(), before)
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(Page.objects.get().category.get(), Category.objects.get())
+        self.assertEqual(Blog.objects.filter(excerpt='Body of post 0').count(), 1)
+        self.assertEqual([b.title for b in search_blogs('tag', Blog.objects.feed())[:10]].count('Post 0'), 1)
+        self.assertFalse(os.path.exists(f'{self.dump}.checkpoint'))
+
+    def test_resume_after_failure(self):
+        before = self.snapshot()
+        self.wipe()
+        self.user.username = 'renamed'
+        self.user.save()
+        with self.assertRaisesMessage(CommandError, 'Unknown users: writer'):
+            call_command('import_content', self.dump, batch_size=2, stdout=StringIO())
+        self.assertTrue(os.path.exists(f'{self.dump}.checkpoint'))
+        self.assertEqual(Tag.objects.count(), 3)
+        self.user.username = 'writer'
+        self.user.save()
+        call_command('import_content', self.dump, batch_size=2, resume=True, stdout=StringIO())
+        call_command('import_content', self.dump, batch_size=2, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+
+class SearchIndexTests(BlogFixtureMixin, TestCase):
+    def search(self, query):
+        return [blog.title for blog in search_blogs(query, Blog.objects.feed())[:20]]
+
+    def test_title_matches_rank_above_body_matches(self):
+        Blog.objects.create(author=self.user, page=self.page, title='Other', subtitle='x',
+                            content='<p>quantum mechanics</p>')
+        Blog.objects.create(author=self.user, page=self.page, title='Quantum', subtitle='x',
+                            content='<p>intro</p>')
+        self.assertEqual(self.search('quantum'), ['Quantum', 'Other'])
+
+    def test_content_is_indexed_without_markup(self):
+        Blog.objects.create(author=self.user, page=self.page, title='Markup', subtitle='x',
+                            content='<p class="lead">first</p><p>second</p>')
+        self.assertEqual(self.search('lead'), [])
+        self.assertEqual(self.search('firstsecond'), [])
+        self.assertEqual(self.search('second'), ['Markup'])
+
+    def test_related_edits_and_deletes_keep_index_in_sync(self):
+        blog = self.create_blogs(1)[0]
+        self.assertEqual(self.search('Tag'), ['Post 0'])
+        tag = self.tags[0]
+        tag.title = 'Relativity'
+        tag.save()
+        self.assertEqual(self.search('relativity'), ['Post 0'])
+        self.category.title = 'Astronomy'
+        self.category.save()
+        self.assertEqual(self.search('astronomy'), ['Post 0'])
+        tag.delete()
+        self.assertEqual(self.search('relativity'), [])
+        blog.delete()
+        self.assertEqual(self.search('post'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.create_blogs(1)
+        self.assertEqual(self.search('post"*: ('), ['Post 0'])
+        self.assertEqual(search_blogs('!!!', Blog.objects.feed()).count(), 0)
+
+    def test_rebuild_command(self):
+        self.create_blogs(2)
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM blogs_blog_search')
+        self.assertEqual(self.search('post'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(sorted(self.search('post')), ['Post 0', 'Post 1'])
+
+
+def make_image(size=(400, 300), image_format='JPEG', exif=False):
+    image = Image.new('RGB', size, 'navy')
+    options = {}
+    if exif:
+        data = Image.Exif()
+        data[0x010F] = 'Camera maker'
+        options['exif'] = data
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+class ThumbnailTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_upload_creates_every_size_and_format(self):
+        self.page.image.save('cover.jpg', ContentFile(make_image()))
+        storage = self.page.image.storage
+        for pixels in thumbnails.pixel_sizes():
+            for extension, _, _ in thumbnails.FORMATS:
+                name = thumbnails.thumbnail_name(self.page.image.name, pixels, extension)
+                with Image.open(storage.path(name)) as image:
+                    self.assertEqual(image.size, (pixels, pixels))
+                    self.assertFalse(image.getexif())
+
+    def test_saving_without_new_upload_keeps_thumbnails(self):
+        self.page.image.save('cover.jpg', ContentFile(make_image()))
+        name = thumbnails.thumbnail_name(self.page.image.name, 60, 'webp')
+        os.remove(self.page.image.storage.path(name))
+        self.page.save()
+        self.assertFalse(self.page.image.storage.exists(name))
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertTrue(self.page.image.storage.exists(name))
+        self.assertIn('Created 1 thumbnails', out.getvalue())
+
+    def test_form_strips_exif_and_clamps_dimensions(self):
+        upload = SimpleUploadedFile('huge.jpg', make_image((3000, 1000), exif=True), content_type='image/jpeg')
+        form = PageForm({'title': 'Optics', 'category': [self.category.pk]}, {'image': upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        page = form.save(commit=False)
+        page.creator = self.user
+        page.save()
+        with Image.open(page.image.path) as image:
+            self.assertEqual(image.size, (thumbnails.MAX_DIMENSION, 683))
+            self.assertFalse(image.getexif())
+
+    def test_small_upload_is_stored_unchanged(self):
+        data = make_image()
+        upload = SimpleUploadedFile('small.jpg', data, content_type='image/jpeg')
+        self.assertIs(thumbnails.normalize_upload(upload), upload)
+
+    def test_template_tag_emits_srcset(self):
+        self.page.image.save('cover.png', ContentFile(make_image(image_format='PNG')))
+        html = Template('{% load blogs_extras %}{% thumbnail image 50 alt="Cover" %}').render(
+            Context({'image': self.page.image})
+        )
+        stem = os.path.splitext(self.page.image.name)[0]
+        self.assertIn(f'<source type="image/webp" srcset="/media/thumbs/{stem}-50.webp 1x, /media/thumbs/{stem}-100.webp 2x">', html)
+        self.assertIn(f'src="/media/thumbs/{stem}-50.jpg"', html)
+        self.assertIn('alt="Cover"', html)
+
+    def test_template_tag_falls_back_to_static_default(self):
+        html = Template("{% load blogs_extras %}{% thumbnail image 30 default='img/menu.jpg' %}").render(
+            Context({'image': None})
+        )
+        self.assertIn('img/menu.jpg', html)
+        self.assertNotIn('<picture>', html)
+
+
+class StaticAssetTests(BlogFixtureMixin, TestCase):
+    def test_editor_assets_only_on_editor_pages(self):
+        response = self.client.get(reverse('page_detail', args=[self.page.slug]))
+        self.assertNotContains(response, 'ckeditor')
+        Profile.objects.create(user=self.user, birth_date='1990-01-01')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('post', args=[self.page.slug]))
+        self.assertContains(response, 'ckeditor/ckeditor/ckeditor.js')
+        self.assertContains(response, 'ckeditor/ckeditor.css')
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        source, target = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.addCleanup(shutil.rmtree, target)
+        css = b'body { background: url("missing.png"); }\n' * 40
+        os.mkdir(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'wb') as f:
+            f.write(css)
+        with override_settings(
+            STATICFILES_DIRS=[source],
+            STATIC_ROOT=target,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'BlogWebSiteWithDjango.storage.CompressedManifestStaticFilesStorage'},
+            },
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('css/site.css')
+        self.assertRegex(hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        with gzip.open(os.path.join(target, hashed + '.gz')) as f:
+            self.assertEqual(f.read(), css)
+
+
+class CounterTests(BlogFixtureMixin, TestCase):
+    def assertCounts(self, tags=None, page=None, category=None):
+        if tags is not None:
+            self.assertEqual(list(Tag.objects.order_by('title').values_list('blog_count', flat=True)), tags)
+        if page is not None:
+            self.assertEqual(Page.objects.get(pk=self.page.pk).blog_count, page)
+        if category is not None:
+            self.assertEqual(Category.objects.get(pk=self.category.pk).page_count, category)
+
+    def test_blog_and_tag_changes_move_counters(self):
+        blog, other = self.create_blogs(2)
+        self.assertCounts(tags=[2, 2, 2], page=2, category=1)
+        blog.tags.remove(self.tags[0])
+        self.assertCounts(tags=[1, 2, 2])
+        self.tags[1].blog_set.clear()
+        self.assertCounts(tags=[1, 0, 2])
+        other.tags.clear()
+        self.assertCounts(tags=[0, 0, 1])
+        self.tags[0].blog_set.add(blog, other)
+        self.assertCounts(tags=[2, 0, 1])
+        blog.delete()
+        self.assertCounts(tags=[1, 0, 0], page=1)
+
+    def test_moving_blog_to_another_page(self):
+        blog = self.create_blogs(1)[0]
+        other = Page.objects.create(creator=self.user, title='Chemistry')
+        blog = Blog.objects.get(pk=blog.pk)
+        blog.page = other
+        blog.save()
+        self.assertCounts(page=0)
+        self.assertEqual(Page.objects.get(pk=other.pk).blog_count, 1)
+
+    def test_saving_a_stale_instance_keeps_counts(self):
+        stale = Tag.objects.get(pk=self.tags[0].pk)
+        self.create_blogs(3)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(Tag.objects.get(pk=stale.pk).blog_count, 3)
+
+    def test_page_delete_releases_category(self):
+        self.page.delete()
+        self.assertCounts(category=0)
+
+    def test_reconcile_fixes_drift(self):
+        self.create_blogs(2)
+        Tag.objects.update(blog_count=7)
+        Page.objects.update(blog_count=0)
+        self.assertEqual(reconcile_counters(), {'blogs.Tag': 3, 'blogs.Page': 1, 'blogs.Category': 0})
+        self.assertCounts(tags=[2, 2, 2], page=2, category=1)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('0 corrections', out.getvalue())
+
+    def test_tag_cloud_is_cached(self):
+        self.create_blogs(1)
+        with self.assertNumQueries(2):
+            cloud = tag_cloud()
+        self.assertEqual([tag['title'] for tag in cloud['tags']], ['Tag 0', 'Tag 1', 'Tag 2'])
+        self.assertEqual(cloud['categories'][0]['public_count'], 1)
+        with self.assertNumQueries(0):
+            tag_cloud()
+        cache.delete(TAG_CLOUD_CACHE_KEY)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Popular Tags')
+
+
+class AdminChangelistTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser(username='admin', password='secret-pass')
+        self.client.force_login(admin)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_blog_changelist_queries_do_not_grow(self):
+        url = reverse('admin:blogs_blog_changelist')
+        self.create_blogs(5)
+        _, few = self.changelist_queries(url)
+        self.create_blogs(20)
+        _, many = self.changelist_queries(url)
+        self.assertEqual(few, many)
+
+    def test_filters_render_only_selected_objects(self):
+        for i in range(30):
+            Tag.objects.create(title=f'Extra {i}')
+        response, _ = self.changelist_queries(
+            reverse('admin:blogs_blog_changelist') + f'?tags__id__exact={self.tags[1].pk}'
+        )
+        self.assertContains(response, 'data-lookup="tags__id__exact"')
+        self.assertContains(response, f'<option value="{self.tags[1].pk}" selected>Tag 1</option>', html=True)
+        self.assertNotContains(response, 'Extra 0')
+        for field in ('tags', 'page', 'author'):
+            response = self.client.get(
+                reverse('admin:autocomplete'),
+                {'app_label': 'blogs', 'model_name': 'blog', 'field_name': field, 'term': 'e'},
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_search_uses_full_text_index(self):
+        self.create_blogs(2)
+        Blog.objects.create(
+            author=self.user, page=self.page, title='Quantum', subtitle='Entanglement', content='<p>Spooky</p>'
+        )
+        response, _ = self.changelist_queries(reverse('admin:blogs_blog_changelist') + '?q=spook')
+        self.assertEqual([blog.title for blog in response.context['cl'].result_list], ['Quantum'])
+        response, _ = self.changelist_queries(reverse('admin:blogs_blog_changelist') + '?q=writer')
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_page_search_matches_title_prefix_and_creator(self):
+        Page.objects.create(creator=User.objects.get(username='admin'), title='Biology')
+        url = reverse('admin:blogs_page_changelist')
+        for term, titles in (('phy', ['Physics']), ('Bio', ['Biology']), ('writer', ['Physics']), ('ysics', [])):
+            response, _ = self.changelist_queries(f'{url}?q={term}')
+            self.assertEqual([page.title for page in response.context['cl'].result_list], titles)
+
+    def test_large_unfiltered_lists_use_the_estimate(self):
+        blogs = self.create_blogs(3)
+        self.assertEqual(estimated_count(Blog), blogs[-1].pk)
+        paginator = EstimatedCountPaginator(Blog.objects.order_by('pk'), 2)
+        paginator.estimate_threshold = 1
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, blogs[-1].pk)
+        filtered = EstimatedCountPaginator(Blog.objects.filter(title='Post 0').order_by('pk'), 2)
+        filtered.estimate_threshold = 1
+        self.assertEqual(filtered.count, 1)
+
+
+class AutocompleteTests(BlogFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Tag.objects.bulk_create([Tag(title=f'Extra {i:02}', slug=f'extra-{i:02}') for i in range(30)])
+
+    def test_prefix_match_pages_by_slug(self):
+        url = reverse('autocomplete', args=['tags'])
+        data = self.client.get(url, {'q': 'Ext', 'field': 'slug'}).json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(data['more'])
+        self.assertEqual(data['results'][0], {'id': 'extra-00', 'text': 'Extra 00', 'slug': 'extra-00'})
+        data = self.client.get(url, {'q': 'ext', 'field': 'slug', 'after': 'extra-19'}).json()
+        self.assertEqual([r['id'] for r in data['results']], [f'extra-{i:02}' for i in range(20, 30)])
+        self.assertFalse(data['more'])
+        data = self.client.get(url, {'q': 'tag 1'}).json()
+        self.assertEqual(data['results'], [{'id': self.tags[1].pk, 'text': 'Tag 1', 'slug': 'tag-1'}])
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['users'])).status_code, 404)
+
+    def test_hidden_rows_are_not_offered(self):
+        secret = Page.objects.create(creator=self.user, title='Secret', is_private=True)
+        hidden_category = Category.objects.create(title='Hidden')
+        secret.category.add(hidden_category)
+        private_tag = Tag.objects.create(title='Private tag')
+        blog = Blog.objects.create(author=self.user, page=secret, title='Diary', subtitle='S', content='C')
+        blog.tags.add(private_tag)
+
+        def texts(source, query):
+            response = self.client.get(reverse('autocomplete', args=[source]), {'q': query})
+            self.assertIn('private', response['Cache-Control'])
+            return [row['text'] for row in response.json()['results']]
+
+        self.assertEqual(texts('pages', 'sec'), [])
+        self.assertEqual(texts('categories', 'hid'), [])
+        self.assertEqual(texts('tags', 'pri'), [])
+        # Unused tags hide nothing and stay selectable.
+        self.assertEqual(texts('tags', 'tag'), ['Tag 0', 'Tag 1', 'Tag 2'])
+        self.client.force_login(self.user)
+        self.assertEqual(texts('pages', 'sec'), ['Secret'])
+        self.assertEqual(texts('categories', 'hid'), ['Hidden'])
+        self.assertEqual(texts('tags', 'pri'), ['Private tag'])
+
+    def test_non_integer_selection_is_ignored(self):
+        self.create_blogs(1)
+        for url in (reverse('index'), reverse('page_detail', args=[self.page.slug])):
+            response = self.client.get(url, {'in_page': 'abc'})
+            self.assertEqual(response.status_code, 200)
+
+    def test_widgets_render_only_selected_options(self):
+        blog_filter = BlogFilter({'tags': ['tag-1'], 'in_page': self.page.pk}, queryset=Blog.objects.all())
+        html = str(blog_filter.form)
+        self.assertIn('data-autocomplete-url="/autocomplete/tags?field=slug"', html)
+        self.assertInHTML('<option value="tag-1" selected>Tag 1</option>', html)
+        self.assertInHTML(f'<option value="{self.page.pk}" selected>Physics</option>', html)
+        self.assertNotIn('Extra', html)
+        self.assertNotIn('Tag 0', html)
+        self.assertNotIn('Science', str(PageFilter({}, queryset=Page.objects.all()).form))
+
+    def test_form_still_validates_against_queryset(self):
+        form = BlogForm({'title': 'T', 'subtitle': 'S', 'content': 'C', 'tags': [self.tags[0].pk, 999999]})
+        self.assertFalse(form.is_valid())
+        self.assertIn('tags', form.errors)
+        form = BlogForm({'title': 'T', 'subtitle': 'S', 'content': 'C', 'tags': [self.tags[0].pk]})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertNotIn('Extra', str(form['tags']))
+
+
+class ConditionalGetTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.blog = self.create_blogs(1)[0]
+        self.url = reverse('blog_detail', args=[self.page.slug, self.blog.slug])
+
+    def revalidate(self, url, response, **headers):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+
+    # The ETag probe itself; with the page cache on, anonymous revalidation needs no queries at all.
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_blog_detail_returns_304_until_something_changes(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.revalidate(self.url, first).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304
+        )
+
+        self.tags[0].title = 'Renamed'
+        self.tags[0].save()
+        second = self.revalidate(self.url, first)
+        self.assertEqual(second.status_code, 200)
+        self.assertContains(second, 'Renamed')
+
+        self.category.title = 'Natural Science'
+        self.category.save()
+        self.assertEqual(self.revalidate(self.url, second).status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        anonymous = self.client.get(self.url)
+        self.client.force_login(self.user)
+        response = self.revalidate(self.url, anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_pending_messages_are_never_swallowed(self):
+        empty = Tag.objects.create(title='Empty')
+        url = reverse('index')
+        first = self.client.get(url)
+        self.assertRedirects(self.client.get(reverse('tags', args=[empty.slug])), url, fetch_redirect_response=False)
+        response = self.revalidate(url, first)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'No blogs were found that fit this tag.')
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+
+    def test_listing_etag_changes_on_delete(self):
+        url = reverse('index')
+        first = self.client.get(url)
+        generation = content_generation()
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        self.blog.delete()
+        self.assertNotEqual(content_generation(), generation)
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+        self.assertNotEqual(self.revalidate(url, first)['ETag'], first['ETag'])
+
+
+    def test_per_process_cache_is_flagged(self):
+        self.assertEqual(checks.check_shared_cache(None), [])
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([w.id for w in checks.check_shared_cache(None)], ['blogs.W001'])
+
+
+class FeedTests(BlogFixtureMixin, TestCase):
+    def test_site_feed_lists_public_posts_with_excerpts(self):
+        first, second = self.create_blogs(2)
+        Blog.objects.filter(pk=first.pk).update(is_private=True)
+        response = self.client.get(reverse('feed_rss'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        self.assertContains(response, '<title>Post 1</title>')
+        self.assertContains(response, '<description>Body of post 1</description>')
+        self.assertNotContains(response, 'Post 0')
+        atom = self.client.get(reverse('feed_atom'))
+        self.assertContains(atom, '<subtitle>The newest posts from every page.</subtitle>')
+
+    def test_scoped_feeds(self):
+        self.create_blogs(1)
+        other = Page.objects.create(creator=self.user, title='Chemistry')
+        Blog.objects.create(author=self.user, page=other, title='Other page', subtitle='S', content='C')
+        page_feed = self.client.get(reverse('page_feed_rss', args=[other.slug]))
+        self.assertContains(page_feed, 'Other page')
+        self.assertNotContains(page_feed, 'Post 0')
+        tag_feed = self.client.get(reverse('tag_feed_atom', args=[self.tags[0].slug]))
+        self.assertContains(tag_feed, 'Post 0')
+        self.assertNotContains(tag_feed, 'Other page')
+        author_feed = self.client.get(reverse('author_feed_rss', args=['writer']))
+        self.assertContains(author_feed, 'Other page')
+        self.assertEqual(self.client.get(reverse('author_feed_rss', args=['nobody'])).status_code, 404)
+
+    def test_feed_is_cached_until_next_publish(self):
+        self.create_blogs(1)
+        url = reverse('feed_rss')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, first.content)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        Blog.objects.create(author=self.user, page=self.page, title='Fresh', subtitle='S', content='C')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Fresh')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'www.testserver'])
+    def test_cached_feed_keeps_each_host_and_scheme(self):
+        self.create_blogs(1)
+        url = reverse('feed_rss')
+        self.assertContains(self.client.get(url), 'http://testserver/pages/physics/post-0')
+        self.assertContains(self.client.get(url, secure=True), 'https://testserver/pages/physics/post-0')
+        self.assertContains(self.client.get(url, HTTP_HOST='www.testserver'), 'http://www.testserver/pages/physics/post-0')
+        self.assertContains(self.client.get(url), 'http://testserver/pages/physics/post-0')
+
+
+class SitemapTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings = override_settings(SITEMAP_ROOT=root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_index_lists_non_empty_shards(self):
+        first, _ = self.create_blogs(2)
+        Blog.objects.filter(pk=first.pk).update(is_private=True)
+        response = self.client.get(reverse('sitemap'))
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        for section in ('blogs', 'pages', 'tags', 'categories'):
+            self.assertContains(response, f'http://testserver/sitemaps/{section}-0.xml')
+        shard = self.client.get(reverse('sitemap_shard', args=['blogs', 0]))
+        body = b''.join(shard.streaming_content).decode()
+        self.assertIn('<loc>http://testserver/pages/physics/post-1</loc>', body)
+        self.assertNotIn('post-0<', body)
+        self.assertIn(f'<lastmod>{Blog.objects.get(slug="post-1").updated_at.isoformat(timespec="seconds")}', body)
+        self.assertEqual(self.client.get(reverse('sitemap_shard', args=['blogs', 9])).status_code, 404)
+
+    def test_shards_are_chunked_and_split_by_primary_key(self):
+        pks = [blog.pk for blog in self.create_blogs(5)]
+        with mock.patch.multiple(sitemaps, SHARD_SIZE=2, CHUNK_SIZE=1):
+            shards = sitemaps.ensure_all('http://example.com')
+        blog_shards = {number: meta['urls'] for section, number, meta in shards if section == 'blogs'}
+        expected = {}
+        for pk in pks:
+            expected[(pk - 1) // 2] = expected.get((pk - 1) // 2, 0) + 1
+        self.assertEqual(blog_shards, expected)
+
+    def test_only_changed_shards_are_rewritten(self):
+        self.create_blogs(1)
+        sitemaps.ensure_all('http://example.com')
+        blog_path = sitemaps.shard_path('blogs', 0, 'http://example.com')
+        tag_path = sitemaps.shard_path('tags', 0, 'http://example.com')
+        os.utime(blog_path, (0, 0))
+        os.utime(tag_path, (0, 0))
+        sitemaps.ensure_all('http://example.com')
+        self.assertEqual(os.path.getmtime(blog_path), 0)
+        Blog.objects.create(author=self.user, page=self.page, title='Fresh', subtitle='S', content='C')
+        sitemaps.ensure_all('http://example.com')
+        self.assertNotEqual(os.path.getmtime(blog_path), 0)
+        self.assertEqual(os.path.getmtime(tag_path), 0)
+        with open(blog_path) as shard:
+            self.assertIn('http://example.com/pages/physics/fresh', shard.read())
+
+    def test_each_base_url_gets_its_own_files(self):
+        self.create_blogs(1)
+        url = reverse('sitemap_shard', args=['blogs', 0])
+
+        def body(response):
+            return b''.join(response.streaming_content).decode()
+
+        self.assertIn('<loc>http://testserver/', body(self.client.get(url)))
+        self.assertIn('<loc>https://testserver/', body(self.client.get(url, secure=True)))
+        self.assertIn('<loc>http://testserver/', body(self.client.get(url)))
+
+    def test_missing_file_is_regenerated(self):
+        self.create_blogs(1)
+        url = reverse('sitemap_shard', args=['blogs', 0])
+        self.client.get(url)
+        os.remove(sitemaps.shard_path('blogs', 0, 'http://testserver'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('post-0', b''.join(response.streaming_content).decode())
+
+    def test_unchanged_generation_serves_without_queries(self):
+        self.create_blogs(1)
+        url = reverse('sitemap_shard', args=['pages', 0])
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('sitemap'))
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+
+class DatabaseTuningTests(BlogFixtureMixin, TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_file_database_uses_wal_and_setting_overrides(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings = {**connections['default'].settings_dict, 'NAME': os.path.join(root, 'wal.sqlite3')}
+        wrapper = connections['default'].__class__(settings, alias='wal-test')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    @override_settings(DATABASE_READ_REPLICA='replica')
+    def test_router_sends_content_reads_to_replica(self):
+        self.assertEqual(Blog.objects.all().db, 'default')
+        with use_replica():
+            self.assertEqual(Blog.objects.all().db, 'replica')
+            self.assertEqual(Profile.objects.all().db, 'replica')
+            self.assertEqual(User.objects.all().db, 'default')
+        self.assertEqual(Blog.objects.all().db, 'default')
+
+    @override_settings(DATABASE_READ_REPLICA='replica')
+    def test_replica_reads_keeps_writes_and_redirects_on_primary(self):
+        seen = []
+        view = replica_reads(lambda request: seen.append(Blog.objects.all().db))
+        for method in ('get', 'post'):
+            request = getattr(RequestFactory(), method)('/')
+            request._messages = CookieStorage(request)
+            view(request)
+        request = RequestFactory().get('/')
+        request._messages = CookieStorage(request)
+        messages.success(request, 'Saved')
+        view(request)
+        self.assertEqual(seen, ['replica', 'default', 'default'])
+
+
+class QueryPlanTests(BlogFixtureMixin, TestCase):
+    # EXPLAIN QUERY PLAN for the view queries: each must be answered from its index, never by a
+    # full scan of the table.
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index, ordered=True):
+        plan = self.query_plan(queryset)
+        self.assertTrue(any(f'USING INDEX {index}' in step for step in plan), plan)
+        # Walking the expected index in order up to the LIMIT is fine; any other scan is not.
+        for table in ('blogs_blog', 'blogs_page', 'blogs_blog_tags'):
+            scans = [step for step in plan if step.startswith(f'SCAN {table}') and f'USING INDEX {index}' not in step]
+            self.assertEqual(scans, [], plan)
+        if ordered:
+            self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+    def test_page_detail_listing(self):
+        blogs = Blog.objects.feed().filter(page=self.page)
+        self.assertUsesIndex(blogs[:10], 'blog_page_created_idx')
+        after = KeysetPaginator(blogs, 9)._after(timezone.now(), 1)
+        self.assertUsesIndex(blogs.filter(after)[:10], 'blog_page_created_idx')
+
+    def test_my_blogs_listing(self):
+        self.assertUsesIndex(Blog.objects.feed().filter(author=self.user)[:10], 'blog_author_created_idx')
+
+    def test_tag_listing(self):
+        # Driven by the through table's tag index; only that tag's rows are sorted.
+        tag = self.tags[0]
+        self.assertUsesIndex(Blog.objects.feed().filter(tags=tag)[:12], 'blogs_blog_tags_tag_id', ordered=False)
+        self.assertUsesIndex(Blog.objects.feed().filter(tags__slug=tag.slug)[:12], 'blogs_blog_tags_tag_id', ordered=False)
+
+    def test_my_pages_listing(self):
+        self.assertUsesIndex(Page.objects.filter(creator=self.user).order_by('title')[:10], 'page_creator_title_idx')
+
+    def test_admin_page_search(self):
+        # Each branch of the OR is an index search; ^title (LIKE) walked the whole title index.
+        pages, _ = admin.site._registry[Page].get_search_results(None, Page.objects.order_by('title'), 'Phy')
+        plan = self.query_plan(pages)
+        self.assertIn('MULTI-INDEX OR', plan)
+        self.assertFalse(any(step.startswith('SCAN blogs_page') for step in plan), plan)
+
+    def test_public_feed_uses_partial_index(self):
+        self.assertUsesIndex(Blog.objects.public().feed()[:12], 'blog_public_feed_idx')
+        self.assertUsesIndex(Page.objects.public().order_by('title')[:10], 'page_public_title_idx')
+
+
+class VisibilityTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.public, self.private, self.draft = self.create_blogs(3)
+        Blog.objects.filter(pk=self.private.pk).update(is_private=True)
+        Blog.objects.filter(pk=self.draft.pk).update(is_published=False)
+        self.other = User.objects.create_user(username='reader', password='secret-pass')
+        self.secret_page = Page.objects.create(creator=self.user, title='Diary', is_private=True)
+        self.secret = Blog.objects.create(author=self.user, page=self.secret_page, title='Dear diary', subtitle='S', content='C')
+
+    def test_querysets(self):
+        self.assertEqual(list(Blog.objects.public()), [self.public])
+        self.assertEqual(list(Blog.objects.visible_to(self.other)), [self.public])
+        self.assertEqual(Blog.objects.visible_to(self.user).count(), 4)
+        self.assertEqual(list(Page.objects.visible_to(self.other)), [self.page])
+        self.assertEqual(Page.objects.visible_to(self.user).count(), 2)
+
+    def test_listings_show_only_visible_blogs(self):
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Post 0')
+        for title in ('Post 1', 'Post 2', 'Dear diary'):
+            self.assertNotContains(response, title)
+        self.client.force_login(self.other)
+        response = self.client.get(reverse('page_detail', args=[self.page.slug]))
+        self.assertContains(response, 'Post 0')
+        self.assertNotContains(response, 'Post 1')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('page_detail', args=[self.page.slug]))
+        self.assertContains(response, 'Post 1')
+        self.assertContains(response, 'Post 2')
+
+    def test_post_counts_do_not_reveal_hidden_posts(self):
+        # self.page holds three posts, one of them public.
+        for url in (reverse('page'), reverse('page_detail', args=[self.page.slug])):
+            self.assertNotContains(self.client.get(url), '3 posts')
+            self.client.force_login(self.user)
+            self.assertContains(self.client.get(url), '3 posts')
+            self.client.logout()
+        cloud = tag_cloud()
+        self.assertEqual({tag['public_count'] for tag in cloud['tags']}, {1})
+        self.assertEqual(cloud['categories'][0]['public_count'], 1)
+
+    def test_cloud_and_sitemap_name_only_public_tags_and_categories(self):
+        hidden_tag = Tag.objects.create(title='Hidden tag')
+        self.secret.tags.add(hidden_tag)
+        hidden_category = Category.objects.create(title='Hidden category')
+        self.secret_page.category.add(hidden_category)
+        cloud = tag_cloud()
+        self.assertNotIn('Hidden tag', [tag['title'] for tag in cloud['tags']])
+        self.assertIn('Tag 0', [tag['title'] for tag in cloud['tags']])
+        self.assertNotIn('Hidden category', [category['title'] for category in cloud['categories']])
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with override_settings(SITEMAP_ROOT=root):
+            sitemaps.ensure_all('http://example.com')
+            with open(sitemaps.shard_path('tags', 0, 'http://example.com')) as shard:
+                tags = shard.read()
+            with open(sitemaps.shard_path('categories', 0, 'http://example.com')) as shard:
+                categories = shard.read()
+        self.assertNotIn('hidden-tag', tags)
+        self.assertIn('tag-0', tags)
+        self.assertNotIn('hidden-category', categories)
+        self.assertIn('science', categories)
+
+    def test_conditional_get_does_not_reveal_hidden_blogs(self):
+        url = reverse('blog_detail', args=[self.page.slug, self.private.slug])
+        future = 'Fri, 01 Jan 2100 00:00:00 GMT'
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=future).status_code, 404)
+        secret_url = reverse('blog_detail', args=[self.secret_page.slug, self.secret.slug])
+        self.assertEqual(self.client.get(secret_url, HTTP_IF_MODIFIED_SINCE=future).status_code, 404)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=future).status_code, 304)
+
+    def test_search_pages_and_counts_only_visible_blogs(self):
+        hidden = [
+            Blog.objects.create(author=self.user, page=self.page, title=f'Zebra {i}', subtitle='S', content='C', is_private=True)
+            for i in range(12)
+        ]
+        Blog.objects.create(author=self.user, page=self.page, title='Zebra public', subtitle='S', content='C')
+        results = search_blogs('zebra', Blog.objects.visible_to(self.other).feed())
+        self.assertEqual(results.count(), 1)
+        self.assertEqual([blog.title for blog in results[:9]], ['Zebra public'])
+        response = self.client.get(reverse('searchIndex'), {'q': 'zebra'})
+        self.assertContains(response, 'Zebra public')
+        self.assertNotContains(response, 'No posts were found')
+        self.assertNotContains(response, hidden[0].title)
+
+    def test_hidden_blogs_and_pages_are_not_found(self):
+        private_url = reverse('blog_detail', args=[self.page.slug, self.private.slug])
+        self.assertEqual(self.client.get(private_url).status_code, 404)
+        self.assertEqual(self.client.get(reverse('page_detail', args=[self.secret_page.slug])).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('page')), 'Diary')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(private_url).status_code, 200)
+        self.assertContains(self.client.get(reverse('page_detail', args=[self.secret_page.slug])), 'Dear diary')
+
+
+class PageCacheTests(BlogFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.blog = self.create_blogs(1)[0]
+        self.url = reverse('blog_detail', args=[self.page.slug, self.blog.slug])
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_query_strings_are_normalized(self):
+        url = reverse('index')
+        self.assertEqual(self.client.get(url, {'tags': self.tags[0].slug, 'in_page': self.page.pk})['X-Page-Cache'], 'miss')
+        response = self.client.get(f'{url}?in_page={self.page.pk}&tags={self.tags[0].slug}&utm_source=mail&tags=')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(self.client.get(url, {'tags': self.tags[1].slug})['X-Page-Cache'], 'miss')
+
+    def test_content_changes_invalidate(self):
+        self.client.get(self.url)
+        self.blog.subtitle = 'Rewritten'
+        self.blog.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Rewritten')
+
+    def test_signed_in_users_bypass(self):
+        self.client.get(self.url)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'bypass')
+        self.assertContains(response, reverse('blog_edit', args=[self.page.slug, self.blog.slug]))
+
+    def test_flash_messages_are_neither_cached_nor_swallowed(self):
+        url = reverse('index')
+        self.client.get(url)
+        empty = Tag.objects.create(title='Empty')
+        self.client.get(url)
+        self.client.get(reverse('tags', args=[empty.slug]))
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'bypass')
+        self.assertContains(response, 'No blogs were found that fit this tag.')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        self.assertNotContains(self.client.get(url), 'No blogs were found')
+        # A page that queues its own warning is rendered every time.
+        empty_filter = {'in_page': Page.objects.create(creator=self.user, title='Chemistry').pk}
+        response = self.client.get(url, empty_filter)
+        self.assertContains(response, 'No posts were found that fit this filter.')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url, empty_filter)['X-Page-Cache'], 'miss')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url)['X-Page-Cache'], 'bypass')
+
+    def test_stats(self):
+        for _ in range(4):
+            self.client.get(self.url)
+        stats = pagecache.stats()
+        self.assertEqual((stats['hit']['count'], stats['miss']['count']), (3, 1))
+        self.assertEqual(stats['hit_ratio'], 0.75)
+        self.assertIsNotNone(stats['hit']['avg_ms'])
+        out = StringIO()
+        call_command('page_cache_stats', reset=True, stdout=out)
+        self.assertIn('hit ratio: 75.0%', out.getvalue())
+        self.assertIsNone(pagecache.stats()['hit_ratio'])
+
+
+class SeedAndBenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_content', blogs=60, users=6, pages=5, tags=12, categories=4, batch_size=25, stdout=StringIO(),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seeded_corpus(self):
+        self.assertEqual(Blog.objects.count(), 60)
+        self.assertEqual(Profile.objects.count(), 6)
+        self.assertFalse(any(reconcile_counters().values()))
+        self.assertLess(Blog.objects.public().count(), 60)
+        word = Blog.objects.first().title.split()[0]
+        self.assertTrue(search_blogs(word, Blog.objects.all()))
+        for blog in Blog.objects.filter(page__is_private=True):
+            self.assertEqual(blog.author_id, blog.page.creator_id)
+
+    def test_views_stay_within_query_budgets(self):
+        results = benchmark.run_benchmarks(benchmark.benchmark_urls(), iterations=1, warmup=1)
+        self.assertEqual(set(results), set(benchmark.load_baseline()['views']))
+        self.assertEqual(benchmark.compare(results, benchmark.load_baseline(), latency=False), [])
+
+    def test_compare_reports_regressions(self):
+        baseline = {'views': {'index': {'queries': 3, 'p95_ms': 10.0}}}
+        self.assertEqual(benchmark.compare({'index': {'queries': 3, 'p95_ms': 14.0}}, baseline), [])
+        self.assertEqual(
+            benchmark.compare({'index': {'queries': 4, 'p95_ms': 16.0}}, baseline),
+            ['index: 4 queries, budget 3', 'index: p95 16.0ms, budget 15.0ms'],
+        )
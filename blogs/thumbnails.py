@@ -0,0 +1,142 @@
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'thumbs'
+# Display sizes used by the templates; each is rendered at 1x and 2x.
+THUMBNAIL_SIZES = (30, 50, 100, 150)
+DENSITIES = (1, 2)
+# (extension, Pillow format, mime type), most preferred first.
+FORMATS = (
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpg', 'JPEG', 'image/jpeg'),
+)
+THUMBNAIL_QUALITY = 82
+# Image fields that get thumbnails, as (model label, field name).
+THUMBNAIL_FIELDS = (
+    ('blogs.Page', 'image'),
+    ('accounts.Profile', 'profile_picture'),
+)
+# Uploads larger than this on either side are scaled down before they are stored.
+MAX_DIMENSION = 2048
+
+
+def pixel_sizes():
+    return sorted({size * density for size in THUMBNAIL_SIZES for density in DENSITIES})
+
+
+def thumbnail_name(name, pixels, extension):
+    return f'{THUMBNAIL_DIR}/{os.path.splitext(name)[0]}-{pixels}.{extension}'
+
+
+def has_thumbnails(fieldfile):
+    # The last file generate_thumbnails() writes; its presence means the set is complete.
+    return fieldfile.storage.exists(thumbnail_name(fieldfile.name, pixel_sizes()[-1], FORMATS[-1][0]))
+
+
+def normalize_upload(upload):
+    # Re-encode an upload only when it carries EXIF data or exceeds MAX_DIMENSION, so
+    # ordinary images are stored byte-for-byte as uploaded.
+    if not isinstance(upload, UploadedFile):
+        return upload
+    try:
+        upload.seek(0)
+        image = Image.open(upload)
+        image_format = image.format
+        if getattr(image, 'is_animated', False) or (
+            max(image.size) <= MAX_DIMENSION and not image.getexif()
+        ):
+            return upload
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+        image.save(buffer, format=image_format, icc_profile=image.info.get('icc_profile'), **options)
+    except (OSError, UnidentifiedImageError, ValueError):
+        upload.seek(0)
+        return upload
+    return ContentFile(buffer.getvalue(), name=upload.name)
+
+
+def _flatten(image, image_format):
+    if image_format == 'JPEG' and image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    return image
+
+
+def generate_thumbnails(fieldfile, overwrite=False):
+    # Square, centre-cropped thumbnails in every size and format. Pillow writes no EXIF
+    # unless asked to, so orientation is applied and the metadata is dropped.
+    if not fieldfile:
+        return 0
+    storage = fieldfile.storage
+    wanted = [
+        (pixels, extension, image_format)
+        for pixels in pixel_sizes()
+        for extension, image_format, _ in FORMATS
+        if overwrite or not storage.exists(thumbnail_name(fieldfile.name, pixels, extension))
+    ]
+    if not wanted:
+        return 0
+    try:
+        with storage.open(fieldfile.name, 'rb') as source:
+            image = ImageOps.exif_transpose(Image.open(source))
+            image.load()
+    except (OSError, UnidentifiedImageError) as e:
+        logger.warning('Cannot create thumbnails for %s: %s', fieldfile.name, e)
+        return 0
+    for pixels, extension, image_format in wanted:
+        name = thumbnail_name(fieldfile.name, pixels, extension)
+        buffer = BytesIO()
+        thumbnail = ImageOps.fit(_flatten(image, image_format), (pixels, pixels), Image.LANCZOS)
+        thumbnail.save(buffer, format=image_format, quality=THUMBNAIL_QUALITY)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+    return len(wanted)
+
+
+def srcset(fieldfile, size, extension):
+    storage = fieldfile.storage
+    return ', '.join(
+        f'{storage.url(thumbnail_name(fieldfile.name, size * density, extension))} {density}x'
+        for density in DENSITIES
+    )
+
+
+def picture(fieldfile, size, default=None, **attrs):
+    # <picture> with WebP and JPEG srcsets for a square ``size`` px slot; ``default`` is a
+    # static path used when the field is empty.
+    attrs = format_html_join('', ' {}="{}"', attrs.items())
+    if not fieldfile:
+        src = static(default) if default else ''
+        return format_html('<img src="{}" width="{}" height="{}"{}>', src, size, size, attrs)
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}">',
+        ((mime, srcset(fieldfile, size, extension)) for extension, _, mime in FORMATS[:-1]),
+    )
+    extension = FORMATS[-1][0]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" width="{}" height="{}" loading="lazy"{}></picture>',
+        sources,
+        fieldfile.storage.url(thumbnail_name(fieldfile.name, size, extension)),
+        srcset(fieldfile, size, extension),
+        size,
+        size,
+        attrs,
+    )
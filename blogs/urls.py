@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import feeds, views
 
 urlpatterns = [
     path('', views.index, name='index'),
@@ -19,4 +19,15 @@ urlpatterns = [
     path('pages/<slug:page_slug>/<slug:blog_slug>/delete', views.delete_post_view, name='blog_delete'),
     path('tags/<slug:tag_slug>', views.tag_view, name='tags'),
     path('categories/<slug:category_slug>', views.category_view, name='category'),
+    path('autocomplete/<str:source>', views.autocomplete_view, name='autocomplete'),
+    path('sitemap.xml', views.sitemap_index_view, name='sitemap'),
+    path('sitemaps/<str:section>-<int:number>.xml', views.sitemap_shard_view, name='sitemap_shard'),
+    path('feeds/rss', feeds.cached_feed(feeds.LatestBlogsFeed()), name='feed_rss'),
+    path('feeds/atom', feeds.cached_feed(feeds.LatestBlogsAtomFeed()), name='feed_atom'),
+    path('feeds/pages/<slug:slug>/rss', feeds.cached_feed(feeds.PageFeed()), name='page_feed_rss'),
+    path('feeds/pages/<slug:slug>/atom', feeds.cached_feed(feeds.PageAtomFeed()), name='page_feed_atom'),
+    path('feeds/tags/<slug:slug>/rss', feeds.cached_feed(feeds.TagFeed()), name='tag_feed_rss'),
+    path('feeds/tags/<slug:slug>/atom', feeds.cached_feed(feeds.TagAtomFeed()), name='tag_feed_atom'),
+    path('feeds/authors/<str:username>/rss', feeds.cached_feed(feeds.AuthorFeed()), name='author_feed_rss'),
+    path('feeds/authors/<str:username>/atom', feeds.cached_feed(feeds.AuthorAtomFeed()), name='author_feed_atom'),
 ]
\ No newline at end of file
@@ -0,0 +1,12 @@
+import re
+from html import unescape
+
+from django.utils.html import strip_tags
+
+BLOCK_TAG_RE = re.compile(r'</?(?:p|div|br|li|ul|ol|h[1-6]|tr|td|th|blockquote|pre|hr)\b[^>]*>', re.IGNORECASE)
+
+
+def html_to_text(html):
+    # Block-level tags become spaces so words from adjacent paragraphs don't run together.
+    text = strip_tags(BLOCK_TAG_RE.sub(' ', html or ''))
+    return ' '.join(unescape(text).split())
@@ -1,27 +1,50 @@
 import datetime
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from django.http import HttpResponseRedirect
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, get_object_or_404
+from django.template.defaultfilters import slugify
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_cookie
+from django.views.decorators.http import require_GET
 
 from accounts.models import Profile
+from BlogWebSiteWithDjango.database import replica_reads
+from blogs.conditional import blog_detail_etag, blog_detail_last_modified, conditional_page, listing_etag
 from blogs.filters import BlogFilter, PageFilter
 from blogs.forms import PageForm, BlogForm, TagForm
 from blogs.models import Page, Category, Blog, Tag
-from django.core.paginator import Paginator
+from blogs.pagecache import cached_page
+from blogs.pagination import CountedPaginator, KeysetPaginator, paginate
+from blogs.search import search_blogs
+from blogs import sitemaps
+from monitoring.timing import span
 from django.contrib import messages
 from django.urls import reverse
 
+PAGE_COUNT_LIMIT = 1000
+PAGE_COUNT_CACHE_TIMEOUT = 300
+AUTOCOMPLETE_SOURCES = {'tags': Tag, 'pages': Page, 'categories': Category}
+AUTOCOMPLETE_LIMIT = 20
 
+
+def page_count_key(request, page_filter):
+    # An anonymous visitor with no filter sees exactly the public pages, so that count is shared.
+    if request.user.is_authenticated or any(request.GET.get(name) for name in page_filter.filters):
+        return None
+    return 'public'
+
+
+@cached_page
+@replica_reads
+@conditional_page(etag_func=listing_etag)
 def index(request):
-    blog_filter = BlogFilter(request.GET, queryset=Blog.objects.all().order_by('-created_at'))
-    blogs = blog_filter.qs
-    if blogs.count() == 0:
-        messages.warning(request, 'No posts were found that fit this filter.')
-    paginator = Paginator(blogs, 12)
-    page = request.GET.get('page')
-    page_obj = paginator.get_page(page)
+    blog_filter = BlogFilter(request.GET, queryset=Blog.objects.public().feed())
+    # Form validation; partials/_filter.html adds the form's rendering to the same span, and
+    # the filtered query itself is counted under "sql" when paginate() runs it.
+    with span('filter'):
+        blogs = blog_filter.qs
+    page_obj = paginate(request, KeysetPaginator(blogs, 12), 'No posts were found that fit this filter.')
     return render(request, 'blogs/index.html', {'page_obj': page_obj, 'filter': blog_filter})
 
 def about(request):
@@ -29,43 +52,30 @@ def about(request):
 
 def search_index(request):
     if 'q' in request.GET and request.GET['q'] != '':
-        blogs = Blog.objects.filter(
-            Q(title__contains=request.GET['q']) |
-            Q(subtitle__contains=request.GET['q']) |
-            Q(content__contains=request.GET['q']) |
-            Q(tags__title__contains=request.GET['q']) |
-            Q(page__title__contains=request.GET['q']) |
-            Q(page__category__title__contains=request.GET['q'])
-        ).distinct()
+        blogs = search_blogs(request.GET['q'], Blog.objects.visible_to(request.user).feed())
     else:
         return HttpResponseRedirect(reverse('index'))
-    if blogs.count() == 0:
-        messages.warning(request, 'No posts were found that fit this search.')
-    paginator = Paginator(blogs, 9)
-    page = request.GET.get('page')
-    page_obj = paginator.get_page(page)
+    page_obj = paginate(request, CountedPaginator(blogs, 9, count_limit=PAGE_COUNT_LIMIT), 'No posts were found that fit this search.')
     return render(request, 'blogs/index.html', {'page_obj': page_obj, 'filterNotView':True})
 
+@cached_page
+@replica_reads
+@conditional_page(etag_func=listing_etag)
 def page_view(request):
-    page_filter = PageFilter(request.GET, queryset=Page.objects.all().order_by('title'))
-    pages = page_filter.qs
-    if pages.count() == 0:
-        messages.warning(request, 'No pages were found that fit this filter.')
+    page_filter = PageFilter(request.GET, queryset=Page.objects.visible_to(request.user).order_by('title'))
+    with span('filter'):
+        pages = page_filter.qs
+    paginator = CountedPaginator(pages, 10, count_limit=PAGE_COUNT_LIMIT, count_cache_timeout=PAGE_COUNT_CACHE_TIMEOUT,
+                                 count_cache_key=page_count_key(request, page_filter))
+    page_obj = paginate(request, paginator, 'No pages were found that fit this filter.')
     categories = Category.objects.all()
-    paginator = Paginator(pages, 10)
-    page = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page)
     return render(request, 'blogs/pages.html', {'categories': categories, 'page_obj': page_obj, 'filter': page_filter})
 
 @login_required
 def my_pages_view(request):
     page_filter = PageFilter(request.GET, queryset=Page.objects.filter(creator=request.user).order_by('title'))
     pages = page_filter.qs
-    if pages.count() == 0:
-        messages.warning(request, 'No pages were found that fit this filter.')
-    paginator = Paginator(pages, 10)
-    page = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page)
+    page_obj = paginate(request, CountedPaginator(pages, 10), 'No pages were found that fit this filter.')
     return render(request, 'blogs/my-pages.html', {'pages': pages, 'page_obj': page_obj, 'filter': page_filter})
 
 
@@ -95,15 +105,15 @@ def create_page_view(request):
 
     return render(request, 'blogs/create-page.html', {'page': page})
 
+@cached_page
+@replica_reads
+@conditional_page(etag_func=listing_etag)
 def page_detail_view(request, page_slug):
-    page = get_object_or_404(Page, slug=page_slug)
-    blog_filter = BlogFilter(request.GET, queryset=Blog.objects.filter(page=page).order_by('-created_at'))
-    blogs = blog_filter.qs
-    if blogs.count() == 0:
-        messages.warning(request, 'No blogs were found that fit this filter.')
-    paginator = Paginator(blogs, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page = get_object_or_404(Page.objects.visible_to(request.user).select_related('creator'), slug=page_slug)
+    blog_filter = BlogFilter(request.GET, queryset=Blog.objects.visible_to(request.user).feed().filter(page=page))
+    with span('filter'):
+        blogs = blog_filter.qs
+    page_obj = paginate(request, KeysetPaginator(blogs, 9), 'No blogs were found that fit this filter.')
     return render(request, 'blogs/page-detail.html', {'page': page, 'page_obj':page_obj, 'filter':blog_filter})
 @login_required
 def edit_page_view(request, page_slug):
@@ -117,8 +127,6 @@ def edit_page_view(request, page_slug):
         if form.is_valid():
             page = form.save(commit=False)
             page.creator = request.user
-            if 'image' in request.FILES:
-                page.image = request.FILES['image']
             if page.slug == page_slug:
                 page.slug = page_slug
             page.save()
@@ -184,19 +192,17 @@ def post_view(request, page_slug):
     return render(request, 'blogs/page-detail.html', {'page': page, 'blog_form': blog, 'tag_form': tag, 'post_view':True})
 
 
+@cached_page
+@replica_reads
+@conditional_page(etag_func=blog_detail_etag, last_modified_func=blog_detail_last_modified)
 def blog_detail_view(request, page_slug, blog_slug):
-    page = get_object_or_404(Page, slug=page_slug)
-    blog = get_object_or_404(Blog, slug=blog_slug)
+    page = get_object_or_404(Page.objects.visible_to(request.user), slug=page_slug)
+    blog = get_object_or_404(Blog.objects.visible_to(request.user), slug=blog_slug)
     return render(request, 'blogs/blog-detail.html', {'page': page, 'blog':blog})
 @login_required
 def my_blogs_view(request):
-    blog_filter = BlogFilter(request.GET, queryset=Blog.objects.filter(author=request.user))
-    blogs = blog_filter.qs
-    if blogs.count() == 0:
-        messages.warning(request, 'No pages were found that fit this filter.')
-    paginator = Paginator(blogs, 9)
-    page = request.GET.get('page')
-    page_obj = paginator.get_page(page)
+    blog_filter = BlogFilter(request.GET, queryset=Blog.objects.feed().filter(author=request.user))
+    page_obj = paginate(request, KeysetPaginator(blog_filter.qs, 9), 'No pages were found that fit this filter.')
     return render(request, 'blogs/my-blogs.html', {'page_obj': page_obj, 'filter': blog_filter})
 @login_required
 def edit_blog_view(request, page_slug, blog_slug):
@@ -248,39 +254,95 @@ def delete_post_view(request, page_slug, blog_slug):
         return HttpResponseRedirect(reverse('blog_detail', args=[page.slug, blog.slug]))
 
 def write_view(request):
-    page_filter = PageFilter(request.GET, queryset=Page.objects.all().order_by('title'))
-    pages = page_filter.qs
-    if pages.count() == 0:
-        messages.warning(request, 'No pages were found that fit this filter.')
+    page_filter = PageFilter(request.GET, queryset=Page.objects.visible_to(request.user).order_by('title'))
+    paginator = CountedPaginator(page_filter.qs, 10, count_limit=PAGE_COUNT_LIMIT, count_cache_timeout=PAGE_COUNT_CACHE_TIMEOUT,
+                                 count_cache_key=page_count_key(request, page_filter))
+    page_obj = paginate(request, paginator, 'No pages were found that fit this filter.')
     categories = Category.objects.all()
-    paginator = Paginator(pages, 10)
-    page = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page)
     return render(request, 'blogs/pages.html', {'categories': categories, 'page_obj': page_obj, 'selectPage': True, 'filter': page_filter})
 
+@cached_page
+@replica_reads
+@conditional_page(etag_func=listing_etag)
 def tag_view(request, tag_slug):
     tag = get_object_or_404(Tag, slug=tag_slug)
-    blogs = Blog.objects.filter(tags__slug=tag_slug)
-    if blogs.count() == 0:
-        messages.warning(request, 'No blogs were found that fit this tag.')
+    page_obj = paginate(request, KeysetPaginator(Blog.objects.visible_to(request.user).feed().filter(tags=tag), 12), 'No blogs were found that fit this tag.')
+    if not page_obj.object_list:
         return HttpResponseRedirect(reverse('index'))
-    paginator = Paginator(blogs, 12)
-    page = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page)
     return render(request, 'blogs/index.html', {'page_obj':page_obj, 'filterNotView': True})
 
+@cached_page
+@replica_reads
+@conditional_page(etag_func=listing_etag)
 def category_view(request, category_slug):
     category = get_object_or_404(Category, slug=category_slug)
-    page = Page.objects.filter(category=category)
-    if page.count() == 0:
-        messages.warning(request, 'No pages were found that fit this category.')
+    pages = Page.objects.visible_to(request.user).filter(category=category).order_by('title')
+    page_obj = paginate(request, CountedPaginator(pages, 10), 'No pages were found that fit this category.')
+    if not page_obj.object_list:
         return HttpResponseRedirect(reverse('index'))
-    paginator = Paginator(page, 10)
-    page = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page)
     return render(request, 'blogs/pages.html', {'page_obj':page_obj, 'filterNotView': True})
 
 
 
 
 # Create your views here.
+
+
+@replica_reads
+@require_GET
+@cache_control(private=True, max_age=60)
+@vary_on_cookie
+def autocomplete_view(request, source):
+    # Prefix match on the unique slug index: a range scan rather than LIKE, so it stays
+    # cheap with many rows. ``after`` is the last slug of the previous batch. Only rows the
+    # user may see are offered, which makes the response per-user.
+    model = AUTOCOMPLETE_SOURCES.get(source)
+    if model is None:
+        raise Http404
+    value_field = 'slug' if request.GET.get('field') == 'slug' else 'pk'
+    prefix = slugify(request.GET.get('q', ''))
+    rows = model.objects.visible_to(request.user).order_by('slug')
+    if prefix:
+        rows = rows.filter(slug__gte=prefix, slug__lt=prefix + '\uffff')
+    if request.GET.get('after'):
+        rows = rows.filter(slug__gt=request.GET['after'])
+    rows = list(rows.values_list('pk', 'slug', 'title')[:AUTOCOMPLETE_LIMIT + 1])
+    results = [
+        {'id': slug if value_field == 'slug' else pk, 'text': title, 'slug': slug}
+        for pk, slug, title in rows[:AUTOCOMPLETE_LIMIT]
+    ]
+    return JsonResponse({'results': results, 'more': len(rows) > AUTOCOMPLETE_LIMIT})
+
+
+@require_GET
+@cache_control(public=True, max_age=3600)
+def sitemap_index_view(request):
+    base_url = request.build_absolute_uri('/').rstrip('/')
+    shards = sitemaps.cached_shards(base_url)
+    return HttpResponse(sitemaps.render_index(shards, base_url), content_type='application/xml')
+
+
+@require_GET
+@cache_control(public=True, max_age=3600)
+def sitemap_shard_view(request, section, number):
+    base_url = request.build_absolute_uri('/').rstrip('/')
+    meta = next(
+        (meta for name, shard, meta in sitemaps.cached_shards(base_url) if (name, shard) == (section, number)),
+        None,
+    )
+    if meta is None:
+        raise Http404
+    etag = f'"{meta["fingerprint"]}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        try:
+            shard = open(sitemaps.shard_path(section, number, base_url), 'rb')
+        except FileNotFoundError:
+            # Removed from disk while the cached shard list survived; write it again.
+            meta = sitemaps.ensure_shard(section, number, base_url)
+            etag = f'"{meta["fingerprint"]}"'
+            shard = open(sitemaps.shard_path(section, number, base_url), 'rb')
+        response = FileResponse(shard, content_type='application/xml')
+    response['ETag'] = etag
+    return response
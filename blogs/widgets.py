@@ -0,0 +1,63 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteMixin:
+    # Renders only the selected options; the rest are fetched from the ``autocomplete`` view
+    # by static/js/autocomplete.js. Validation still runs against the field's queryset.
+
+    def __init__(self, source, attrs=None, choices=()):
+        self.source = source
+        super().__init__(attrs, choices)
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def value_field(self):
+        return getattr(self.choices.field, 'to_field_name', None) or 'pk'
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = (
+            f"{reverse('autocomplete', args=[self.source])}?field={self.value_field()}"
+        )
+        return attrs
+
+    def valid_values(self, value):
+        # Submitted values reach the query before form validation; ones that cannot be the
+        # target field's value (``?in_page=abc``) select nothing rather than erroring.
+        model = self.choices.queryset.model
+        target = model._meta.pk if self.value_field() == 'pk' else model._meta.get_field(self.value_field())
+        selected = set()
+        for v in value:
+            if str(v) in self.choices.field.empty_values:
+                continue
+            try:
+                selected.add(target.to_python(v))
+            except (TypeError, ValueError, ValidationError):
+                pass
+        return selected
+
+    def optgroups(self, name, value, attrs=None):
+        options = []
+        if not self.is_required and not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', '---------', False, 0))
+        field = self.choices.field
+        selected = self.valid_values(value)
+        if selected:
+            lookup = 'pk' if self.value_field() == 'pk' else self.value_field()
+            for obj in self.choices.queryset.filter(**{f'{lookup}__in': selected}):
+                option_value = field.prepare_value(obj)
+                options.append(
+                    self.create_option(name, option_value, field.label_from_instance(obj), True, len(options))
+                )
+        return [(None, options, 0)]
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
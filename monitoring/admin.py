@@ -0,0 +1,68 @@
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from monitoring import profiling
+from monitoring.models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status', 'duration_ms', 'trigger', 'user')
+    list_filter = ('trigger', 'view_name')
+    search_fields = ('path',)
+    list_select_related = ('user',)
+    date_hierarchy = 'created_at'
+    fields = ('created_at', 'method', 'path', 'view_name', 'status', 'duration_ms', 'trigger', 'user', 'downloads', 'report')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/<str:kind>/',
+                self.admin_site.admin_view(self.download_view),
+                name='monitoring_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk, kind):
+        # The files live under MEDIA_ROOT with unguessable names; staff fetch them through here.
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        fieldfile = {'prof': profile.stats_file, 'collapsed': profile.collapsed_file}.get(kind)
+        if not fieldfile:
+            raise Http404
+        return FileResponse(fieldfile.open('rb'), as_attachment=True, filename=fieldfile.name.rsplit('/', 1)[-1])
+
+    @admin.display(description='Files')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">pstats (.prof)</a> · <a href="{}">collapsed stacks (flamegraph.pl, speedscope)</a>',
+            reverse('admin:monitoring_requestprofile_download', args=[obj.pk, 'prof']),
+            reverse('admin:monitoring_requestprofile_download', args=[obj.pk, 'collapsed']),
+        )
+
+    @admin.display(description='Top functions by cumulative time')
+    def report(self, obj):
+        try:
+            return format_html('<pre style="font-size: 11px">{}</pre>', profiling.top_functions(obj))
+        except OSError:
+            return 'The profile file is missing.'
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            **(extra_context or {}),
+            'profile_token': profiling.make_token(request.user) if request.user.is_staff else None,
+            'token_param': profiling.TOKEN_PARAM,
+            'token_header': profiling.TOKEN_HEADER,
+        }
+        return super().changelist_view(request, extra_context)
@@ -0,0 +1,98 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from monitoring import profiling, timing
+
+logger = logging.getLogger('monitoring.slow_requests')
+
+
+class RequestTimingMiddleware:
+    # Adds a Server-Timing header (total, view, SQL, templates and any timing.span() blocks) and
+    # logs requests slower than SLOW_REQUEST_MS as one JSON line each. Put it first in
+    # MIDDLEWARE so "total" covers the rest of the stack. With REQUEST_TIMING off it removes
+    # itself at startup and costs nothing.
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+        timing.instrument_templates()
+
+    def __call__(self, request):
+        request_timing = request.timing = timing.RequestTiming()
+        with ExitStack() as stack:
+            stack.enter_context(timing.activate(request_timing))
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(request_timing))
+            response = self.get_response(request)
+        total_ms = request_timing.elapsed_ms()
+        if request_timing.view_started is not None:
+            request_timing.view_ms = request_timing.elapsed_ms(request_timing.view_started)
+        response['Server-Timing'] = self.server_timing(request_timing, total_ms)
+        if total_ms >= self.slow_ms:
+            logger.warning(json.dumps(self.record(request, response, request_timing, total_ms)))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_started = time.perf_counter()
+
+    def server_timing(self, request_timing, total_ms):
+        metrics = [
+            f'total;dur={total_ms:.1f}',
+            f'view;dur={request_timing.view_ms:.1f}',
+            f'sql;dur={request_timing.sql_ms:.1f};desc="{request_timing.sql_count} queries"',
+            f'tpl;dur={request_timing.template_ms:.1f}',
+        ]
+        metrics.extend(f'{name};dur={ms:.1f}' for name, ms in request_timing.spans.items())
+        return ', '.join(metrics)
+
+    def record(self, request, response, request_timing, total_ms):
+        return {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'page_cache': response.get('X-Page-Cache'),
+            'total_ms': round(total_ms, 1),
+            'view_ms': round(request_timing.view_ms, 1),
+            'sql_ms': round(request_timing.sql_ms, 1),
+            'sql_count': request_timing.sql_count,
+            'template_ms': round(request_timing.template_ms, 1),
+            'spans': {name: round(ms, 1) for name, ms in request_timing.spans.items()},
+            'top_sql': request_timing.top_statements(),
+        }
+
+
+class ProfilingMiddleware:
+    # Runs the rest of the request under cProfile when a staff token is present or the URL's
+    # sampling rate hits, and stores the profile (see monitoring.profiling). Installed last, a
+    # profile covers URL resolution, the view with its ATOMIC_REQUESTS transaction and
+    # exception handling, and nothing of the other middleware. Requests that fail are
+    # profiled too. Everything else passes straight through, so it is safe to leave installed.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = profiling.trigger_for(request)
+        if trigger is None:
+            return self.get_response(request)
+        # Tells caches in the view (blogs.pagecache) to render for real.
+        request.profiling = True
+        profiler = profiling.start_profiler()
+        if profiler is None:
+            return self.get_response(request)
+        response = None
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.stop_profiler(profiler)
+            profile = profiling.save_profile(request, response, profiler, time.perf_counter() - started, *trigger)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
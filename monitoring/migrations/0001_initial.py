@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view_name', models.CharField(blank=True, db_index=True, max_length=200)),
+                ('status', models.PositiveSmallIntegerField(null=True)),
+                ('duration_ms', models.FloatField()),
+                ('trigger', models.CharField(choices=[('staff', 'Staff token'), ('sample', 'Sampled')], max_length=10)),
+                ('stats_file', models.FileField(max_length=200, upload_to='profiles/%Y/%m/%d/')),
+                ('collapsed_file', models.FileField(max_length=200, upload_to='profiles/%Y/%m/%d/')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
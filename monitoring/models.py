@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    STAFF = 'staff'
+    SAMPLE = 'sample'
+    TRIGGER_CHOICES = (
+        (STAFF, 'Staff token'),
+        (SAMPLE, 'Sampled'),
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True, db_index=True)
+    status = models.PositiveSmallIntegerField(null=True)
+    duration_ms = models.FloatField()
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    # Unguessable names under MEDIA_ROOT; the admin serves them to staff.
+    stats_file = models.FileField(upload_to='profiles/%Y/%m/%d/', max_length=200)
+    collapsed_file = models.FileField(upload_to='profiles/%Y/%m/%d/', max_length=200)
+
+    class Meta:
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} ms)'
@@ -0,0 +1,163 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.urls import Resolver404, resolve
+
+from monitoring.models import RequestProfile
+
+TOKEN_SALT = 'monitoring.profile'
+TOKEN_PARAM = '_profile'
+TOKEN_HEADER = 'X-Profile-Token'
+# Frames deeper than this, or shares of a path below MIN_COLLAPSED_US, are left out of the
+# collapsed stacks to keep recursive or very wide call graphs bounded.
+MAX_STACK_DEPTH = 64
+MIN_COLLAPSED_US = 10
+
+_busy = threading.Lock()
+
+
+def make_token(user):
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def token_user(token):
+    # The active staff user a token was made for, or None when it is invalid or expired.
+    try:
+        pk = signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=pk, is_staff=True, is_active=True).first()
+
+
+def trigger_for(request):
+    # (trigger, user) when this request should be profiled, else None. Cheap for the common case:
+    # no token and no sampling rates means two dict lookups and no URL resolving.
+    token = request.GET.get(TOKEN_PARAM) or request.headers.get(TOKEN_HEADER)
+    if token:
+        user = token_user(token)
+        if user is not None:
+            return 'staff', user
+    if settings.PROFILE_SAMPLE_RATES:
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return None
+        rate = settings.PROFILE_SAMPLE_RATES.get(url_name)
+        if rate and random.random() < rate:
+            return 'sample', None
+    return None
+
+
+def start_profiler():
+    # A running profiler, or None when another request is being profiled: cProfile can only
+    # profile one thing at a time, so concurrent triggers are skipped, not queued.
+    if not _busy.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profiler(profiler):
+    profiler.disable()
+    _busy.release()
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f'{os.path.basename(filename)}:{name}:{line}'
+
+
+def collapse(stats):
+    # Brendan Gregg's collapsed-stack format ("a;b;c microseconds") for flamegraph.pl or
+    # speedscope. pstats keeps caller/callee edges rather than whole stacks, so each function's
+    # time is split across its callers in proportion to the time spent under each.
+    stats = stats.stats
+    children = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller in callers:
+            children.setdefault(caller, []).append(func)
+    lines = {}
+
+    def walk(func, path, share):
+        _, _, own, total, _ = stats[func]
+        path = path + (func,)
+        micros = round(own * share * 1e6)
+        if micros >= MIN_COLLAPSED_US:
+            key = ';'.join(_label(frame) for frame in path)
+            lines[key] = lines.get(key, 0) + micros
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for child in children.get(func, ()):
+            child_total = stats[child][3]
+            edge_total = stats[child][4][func][3]
+            if child in path or not child_total:
+                continue
+            child_share = share * edge_total / child_total
+            if child_total * child_share * 1e6 >= MIN_COLLAPSED_US:
+                walk(child, path, child_share)
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            walk(func, (), 1.0)
+    return ''.join(f'{key} {micros}\n' for key, micros in sorted(lines.items()))
+
+
+def save_profile(request, response, profiler, seconds, trigger, user):
+    stats = pstats.Stats(profiler)
+    name = uuid.uuid4().hex
+    # Set while resolving the URL; missing when it did not resolve.
+    url_name = getattr(request.resolver_match, 'url_name', None)
+    query = request.GET.copy()
+    query.pop(TOKEN_PARAM, None)
+    profile = RequestProfile(
+        method=request.method,
+        path=(request.path + (f'?{query.urlencode()}' if query else ''))[:500],
+        view_name=url_name or '',
+        status=getattr(response, 'status_code', None),
+        duration_ms=seconds * 1000,
+        trigger=trigger,
+        user=user,
+    )
+    # Same bytes as Stats.dump_stats(), so the file loads with pstats.Stats(path) or snakeviz.
+    profile.stats_file.save(f'{name}.prof', ContentFile(marshal.dumps(stats.stats)), save=False)
+    profile.collapsed_file.save(f'{name}.collapsed.txt', ContentFile(collapse(stats).encode()), save=False)
+    profile.save()
+    prune()
+    return profile
+
+
+def prune():
+    stale = RequestProfile.objects.order_by('-created_at', '-pk')[settings.PROFILE_KEEP:]
+    for profile in stale:
+        profile.delete()
+
+
+def top_functions(profile, limit=40):
+    # Text report for the admin, loaded back from the stored .prof file.
+    stream = io.StringIO()
+    with profile.stats_file.open('rb') as source:
+        stats = pstats.Stats(_Loaded(marshal.loads(source.read())), stream=stream)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+
+class _Loaded:
+    # pstats.Stats accepts any object with create_stats() and a .stats dict.
+    def __init__(self, data):
+        self.stats = data
+
+    def create_stats(self):
+        pass
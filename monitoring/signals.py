@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from monitoring.models import RequestProfile
+
+
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_files(sender, instance, **kwargs):
+    instance.stats_file.delete(save=False)
+    instance.collapsed_file.delete(save=False)
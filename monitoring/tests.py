@@ -0,0 +1,187 @@
+import cProfile
+import json
+import pstats
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blogs.models import Blog, Category, Page
+from monitoring import profiling, timing
+from monitoring.models import RequestProfile
+from monitoring.timing import RequestTiming
+
+
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer', password='secret-pass')
+        cls.category = Category.objects.create(title='Science')
+        for title in ('Physics', 'Chemistry', 'Biology'):
+            page = Page.objects.create(creator=cls.user, title=title)
+            page.category.add(cls.category)
+            Blog.objects.create(author=cls.user, page=page, title=f'{title} post', subtitle='S', content='C')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('index')))
+
+    @override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=60000)
+    def test_server_timing_header(self):
+        header = self.client.get(reverse('index'))['Server-Timing']
+        metrics = dict(part.split(';', 1) for part in header.split(', '))
+        self.assertEqual(set(metrics), {'total', 'view', 'sql', 'tpl', 'filter'})
+        self.assertRegex(metrics['sql'], r'^dur=[\d.]+;desc="\d+ queries"$')
+
+    @override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_repeated_sql(self):
+        with self.assertLogs('monitoring.slow_requests', 'WARNING') as logs:
+            response = self.client.get(reverse('category', args=[self.category.slug]))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['status'], response.status_code)
+        self.assertEqual(record['view'], 'category')
+        self.assertGreaterEqual(record['total_ms'], record['view_ms'])
+        self.assertGreaterEqual(record['sql_count'], sum(statement['count'] for statement in record['top_sql']))
+        # The per-page lookups of the page list render the same statement once per page.
+        self.assertGreaterEqual(record['top_sql'][0]['count'], 3)
+
+    def test_filter_span_covers_form_rendering(self):
+        class SlowForm:
+            def __str__(self):
+                time.sleep(0.02)
+                return '<input>'
+
+        request_timing = RequestTiming()
+        with timing.activate(request_timing):
+            html = Template("{% load blogs_extras %}{% timed form 'filter' %}").render(Context({'form': SlowForm()}))
+        self.assertEqual(html, '&lt;input&gt;')
+        self.assertGreaterEqual(request_timing.spans['filter'], 20)
+
+    def test_statements_are_grouped_across_in_list_lengths(self):
+        timing = RequestTiming()
+        with connection.execute_wrapper(timing):
+            list(Blog.objects.filter(pk__in=[1, 2]))
+            list(Blog.objects.filter(pk__in=[1, 2, 3]))
+        self.assertEqual(timing.sql_count, 2)
+        self.assertEqual(timing.top_statements()[0]['count'], 2)
+        self.assertIn('IN (...)', timing.top_statements()[0]['sql'])
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='admin', password='secret-pass', is_staff=True, is_superuser=True)
+        cls.user = User.objects.create_user(username='reader', password='secret-pass')
+        page = Page.objects.create(creator=cls.staff, title='Physics')
+        Blog.objects.create(author=cls.staff, page=page, title='Physics post', subtitle='S', content='C')
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_not_profiled_by_default(self):
+        response = self.client.get(reverse('index'))
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_staff_token_profiles_the_request(self):
+        token = profiling.make_token(self.staff)
+        response = self.client.get(reverse('index'), {profiling.TOKEN_PARAM: token, 'page': '1'})
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.trigger, profile.user, profile.view_name), ('staff', self.staff, 'index'))
+        # The token is stripped from the stored path.
+        self.assertEqual(profile.path, '/?page=1')
+        self.assertIn('function calls', profiling.top_functions(profile))
+        with profile.collapsed_file.open('rb') as collapsed:
+            self.assertRegex(collapsed.readline().decode(), r'^\S.* \d+\n$')
+
+    def test_failing_requests_are_profiled(self):
+        url = reverse('blog_detail', args=['missing', 'missing'])
+        response = self.client.get(url, {profiling.TOKEN_PARAM: profiling.make_token(self.staff)})
+        self.assertEqual(response.status_code, 404)
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.status, profile.view_name), (404, 'blog_detail'))
+
+    def test_token_header(self):
+        response = self.client.get(reverse('index'), headers={profiling.TOKEN_HEADER: profiling.make_token(self.staff)})
+        self.assertIn('X-Profile-Id', response)
+
+    def test_invalid_and_non_staff_tokens_are_ignored(self):
+        for token in ('garbage', profiling.make_token(self.user), profiling.make_token(self.staff) + 'x'):
+            response = self.client.get(reverse('index'), {profiling.TOKEN_PARAM: token})
+            self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILE_TOKEN_MAX_AGE=-1)
+    def test_expired_token_is_ignored(self):
+        response = self.client.get(reverse('index'), {profiling.TOKEN_PARAM: profiling.make_token(self.staff)})
+        self.assertNotIn('X-Profile-Id', response)
+
+    @override_settings(PROFILE_SAMPLE_RATES={'index': 1.0})
+    def test_sampling(self):
+        self.assertIn('X-Profile-Id', self.client.get(reverse('index')))
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('searchIndex')))
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.trigger, profile.user), ('sample', None))
+
+    @override_settings(PROFILE_SAMPLE_RATES={'index': 1.0}, PROFILE_KEEP=2)
+    def test_prune_keeps_newest_and_deletes_files(self):
+        for _ in range(3):
+            self.client.get(reverse('index'))
+        self.assertEqual(RequestProfile.objects.count(), 2)
+        storage = RequestProfile._meta.get_field('stats_file').storage
+        files = [name for profile in RequestProfile.objects.all() for name in (profile.stats_file.name, profile.collapsed_file.name)]
+        directory = files[0].rsplit('/', 1)[0]
+        self.assertCountEqual(storage.listdir(directory)[1], [name.rsplit('/', 1)[-1] for name in files])
+
+    def test_collapse(self):
+        def leaf():
+            return sum(range(20000))
+
+        def root():
+            return [leaf() for _ in range(5)]
+
+        profiler = cProfile.Profile()
+        profiler.runcall(root)
+        lines = profiling.collapse(pstats.Stats(profiler)).splitlines()
+        stacks = dict(line.rsplit(' ', 1) for line in lines)
+        # Most of the time is in sum(), reached through root -> leaf.
+        self.assertTrue(any(
+            ':root:' in stack and ':leaf:' in stack and stack.endswith('builtins.sum>') for stack in stacks
+        ), stacks)
+        self.assertTrue(all(int(micros) >= profiling.MIN_COLLAPSED_US for micros in stacks.values()))
+
+    def test_admin_shows_token_and_serves_files(self):
+        token = profiling.make_token(self.staff)
+        profile_id = self.client.get(reverse('index'), {profiling.TOKEN_PARAM: token})['X-Profile-Id']
+        self.client.force_login(self.staff)
+        changelist = self.client.get(reverse('admin:monitoring_requestprofile_changelist'))
+        self.assertContains(changelist, f'?{profiling.TOKEN_PARAM}=')
+        self.assertContains(self.client.get(reverse('admin:monitoring_requestprofile_change', args=[profile_id])), 'function calls')
+        for kind in ('prof', 'collapsed'):
+            response = self.client.get(reverse('admin:monitoring_requestprofile_download', args=[profile_id, kind]))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('attachment', response['Content-Disposition'])
+        missing = self.client.get(reverse('admin:monitoring_requestprofile_download', args=[profile_id, 'other']))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_admin_download_requires_staff(self):
+        profile_id = self.client.get(
+            reverse('index'), {profiling.TOKEN_PARAM: profiling.make_token(self.staff)}
+        )['X-Profile-Id']
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('admin:monitoring_requestprofile_download', args=[profile_id, 'prof']))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,92 @@
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.template.backends.django import Template
+
+# Collapses "IN (%s, %s, ...)" so the same statement with different list lengths is counted once.
+IN_LIST_RE = re.compile(r'\((?:%s, )+%s\)')
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    # What one request spent in SQL, template rendering and named spans, in milliseconds.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_ms = 0.0
+        self.sql_ms = 0.0
+        self.sql_count = 0
+        self.template_ms = 0.0
+        self.spans = defaultdict(float)
+        self.statements = defaultdict(lambda: [0, 0.0])
+        self._template_depth = 0
+
+    def elapsed_ms(self, since=None):
+        return (time.perf_counter() - (since or self.started)) * 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.sql_ms += duration
+            self.sql_count += 1
+            statement = self.statements[IN_LIST_RE.sub('(...)', sql)]
+            statement[0] += 1
+            statement[1] += duration
+
+    def top_statements(self, limit=5):
+        ranked = sorted(self.statements.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        return [{'sql': sql, 'count': count, 'ms': round(ms, 2)} for sql, (count, ms) in ranked[:limit]]
+
+
+@contextmanager
+def activate(timing):
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    # Times a block of a view under ``name`` in Server-Timing; free when timing is off.
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.spans[name] += timing.elapsed_ms(started)
+
+
+_original_render = Template.render
+
+
+def _timed_render(self, context=None, request=None):
+    timing = _current.get()
+    if timing is None:
+        return _original_render(self, context, request)
+    # Only the outermost render counts; render_to_string inside a template tag is already in it.
+    timing._template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        timing._template_depth -= 1
+        if not timing._template_depth:
+            timing.template_ms += timing.elapsed_ms(started)
+
+
+def instrument_templates():
+    # Installed only when the middleware is enabled, so a disabled site renders untouched.
+    Template.render = _timed_render
@@ -0,0 +1,15 @@
+'use strict';
+{
+    // Changelist filters rendered by blogs.admin.AutocompleteFilter: reload with the chosen value.
+    const $ = django.jQuery;
+
+    $(document).on('change', 'select.admin-autocomplete[data-lookup]', function() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete(this.dataset.lookup);
+        params.delete('p');
+        if (this.value) {
+            params.set(this.dataset.lookup, this.value);
+        }
+        window.location.search = params.toString();
+    });
+}
@@ -0,0 +1,78 @@
+'use strict';
+// Progressive enhancement for blogs.widgets.AutocompleteSelect(Multiple): the server renders
+// only the selected options, a search box above the <select> fetches the others on demand.
+(function() {
+    const DELAY = 200;
+
+    function enhance(select) {
+        if (select.dataset.autocompleteReady) {
+            return;
+        }
+        select.dataset.autocompleteReady = '1';
+        const input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'form-control form-control-sm mb-1';
+        input.placeholder = 'Type to search…';
+        input.setAttribute('aria-label', 'Search ' + (select.name || ''));
+        select.parentNode.insertBefore(input, select);
+
+        let timer = null;
+        let controller = null;
+
+        function load(term) {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const url = new URL(select.dataset.autocompleteUrl, window.location.origin);
+            url.searchParams.set('q', term);
+            fetch(url, {signal: controller.signal, headers: {'Accept': 'application/json'}})
+                .then((response) => response.json())
+                .then((data) => {
+                    Array.from(select.options).forEach((option) => {
+                        if (!option.selected && option.value !== '') {
+                            option.remove();
+                        }
+                    });
+                    const present = new Set(Array.from(select.options).map((option) => option.value));
+                    data.results.forEach((item) => {
+                        if (!present.has(String(item.id))) {
+                            select.add(new Option(item.text, item.id));
+                        }
+                    });
+                })
+                .catch(() => {});
+        }
+
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => load(input.value), DELAY);
+        });
+        input.addEventListener('focus', () => {
+            if (select.options.length <= select.selectedOptions.length + 1) {
+                load(input.value);
+            }
+        }, {once: true});
+
+        if (select.multiple) {
+            // Plain clicks toggle an option instead of replacing the whole selection.
+            select.addEventListener('mousedown', (event) => {
+                if (event.target.tagName === 'OPTION') {
+                    event.preventDefault();
+                    event.target.selected = !event.target.selected;
+                    select.dispatchEvent(new Event('change', {bubbles: true}));
+                }
+            });
+        }
+    }
+
+    function init() {
+        document.querySelectorAll('select[data-autocomplete-url]').forEach(enhance);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();